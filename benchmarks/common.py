@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import datetime as dt
+import gzip
+from pathlib import Path
+import random
+import time
+from typing import *
+
+__all__ = ['write_client_logs', 'Timer']
+
+
+def _log_lines(lines: int, start: dt.timedelta) -> Generator[str]:
+    seconds = int(start.total_seconds())
+    for i in range(lines):
+        seconds = (seconds + random.randint(0, 5)) % 86400
+        hour, minute, second = seconds // 3600, seconds // 60 % 60, seconds % 60
+        yield (
+            f"[{hour:02}:{minute:02}:{second:02}] [Render thread/INFO]: "
+            f"[CHAT] Some chat message number {i}\n"
+        )
+
+
+def write_client_logs(
+        directory: Path, files: int, lines: int, compress: bool = True
+) -> List[Path]:
+    """
+    Write random client logs named like the ones the game writes, spread over
+    consecutive days
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    date = dt.date(2020, 1, 1)
+    written = []
+    for i in range(files):
+        start = dt.timedelta(seconds=random.randrange(86400))
+        name = f"{date + dt.timedelta(days=i // 3)}-{i % 3 + 1}.log"
+        if compress:
+            file = directory / (name + '.gz')
+            log = gzip.open(file, 'wt')
+        else:
+            file = directory / name
+            log = open(file, 'w')
+        with log:
+            log.writelines(_log_lines(lines, start))
+        written.append(file)
+    return written
+
+
+class Timer:
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed = time.perf_counter() - self.start
@@ -0,0 +1,110 @@
+"""
+Measure the throughput of each installed log decoder, and of every installed
+gzip implementation.
+
+Usage: python -m benchmarks.decoder_benchmark [--lines N]
+"""
+
+import argparse
+import bz2
+import gzip
+import lzma
+from pathlib import Path
+import tempfile
+
+from minecraft_playtime_calculator.minecraft_logs import (
+    CHUNK_SIZE, get_decoder, get_decoders, get_log_timedelta, iter_log_chunks
+)
+from .common import *
+
+
+def get_compressors():
+    compressors = {
+        '.log': lambda data: data,
+        '.log.gz': gzip.compress,
+        '.log.bz2': bz2.compress,
+        '.log.xz': lzma.compress,
+    }
+    try:
+        from compression import zstd
+        compressors['.log.zst'] = zstd.compress
+    except ImportError:
+        try:
+            import zstandard
+            compressors['.log.zst'] = zstandard.ZstdCompressor().compress
+        except ImportError:
+            pass
+    return compressors
+
+
+def get_gzip_openers():
+    """Every importable gzip implementation, not just the one that's used"""
+    openers = {'gzip': gzip.open}
+    try:
+        from isal import igzip
+        openers['gzip (isal)'] = igzip.open
+    except ImportError:
+        pass
+    try:
+        from zlib_ng import gzip_ng
+        openers['gzip (zlib-ng)'] = gzip_ng.open
+    except ImportError:
+        pass
+    return openers
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--lines', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"Installed decoders: {', '.join(get_decoders())}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        source, = write_client_logs(tmp, 1, args.lines, compress=False)
+        data = source.read_bytes()
+        size_mb = len(data) / 1e6
+        print(f"Sample log: {size_mb:.1f} MB\n")
+
+        for suffix, compress in get_compressors().items():
+            file = tmp / f'2020-01-01-2{suffix}'
+            file.write_bytes(compress(data))
+            decoder = get_decoder(file)
+
+            read_time = timedelta_time = float('inf')
+            for _ in range(args.repeat):
+                with Timer() as read:
+                    for _ in iter_log_chunks(file):
+                        pass
+                with Timer() as timedelta:
+                    get_log_timedelta(file)
+                read_time = min(read_time, read.elapsed)
+                timedelta_time = min(timedelta_time, timedelta.elapsed)
+
+            print(
+                f"{decoder.name:16} read {size_mb / read_time:8.1f} MB/s  "
+                f"get_log_timedelta {timedelta_time * 1000:8.1f} ms"
+            )
+
+        file = tmp / '2020-01-01-3.log.gz'
+        file.write_bytes(gzip.compress(data))
+        used = get_decoder(file).name
+        print("\nGzip implementations:")
+        for name, open_gzip in get_gzip_openers().items():
+            read_time = float('inf')
+            for _ in range(args.repeat):
+                with Timer() as read:
+                    with open_gzip(file, 'rb') as log:
+                        while log.read(CHUNK_SIZE):
+                            pass
+                read_time = min(read_time, read.elapsed)
+            print(
+                f"{name:16} read {size_mb / read_time:8.1f} MB/s"
+                f"{'  (used)' if name == used else ''}"
+            )
+
+
+if __name__ == '__main__':
+    main()
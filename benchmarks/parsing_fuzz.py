@@ -0,0 +1,395 @@
+"""
+Differential fuzzing of the log parsing fast paths.
+
+Random logs (including nasty edge cases) are parsed by every fast path and by
+the original get_log_timedelta, and any difference in the calculated playtime
+is reported along with how much faster each fast path is. Differences are
+also checked against a plain read of the whole log, to tell fast path bugs
+("wrong") from bugs in the original.
+
+Usage: python -m benchmarks.parsing_fuzz [--cases N] [--seed N]
+    [--failures DIR]
+"""
+
+from __future__ import annotations
+
+import argparse
+from collections import defaultdict
+import datetime as dt
+import gzip
+from io import SEEK_END, BytesIO, TextIOWrapper
+import mmap
+from pathlib import Path
+import random
+import re
+import sys
+import tempfile
+from typing import *
+from typing import Match, Pattern
+
+from minecraft_playtime_calculator import minecraft_logs
+from minecraft_playtime_calculator.minecraft_logs import (
+    find_last, get_decoder, get_log_timedelta, time_pattern
+)
+from .common import *
+
+T_Parser = Callable[[Path], Optional[dt.timedelta]]
+
+
+# Reference implementations
+
+def reference_find_backwards(
+        stream: TextIO, pattern: Pattern, buffer_size: int = 128
+) -> Optional[Match]:
+    """The original find_backwards"""
+    pos_init = stream.tell()
+    pos = stream.seek(0, SEEK_END)
+    buffer_last = ''
+    match = None
+
+    while pos > 0:
+        pos = max(pos - buffer_size, 0)
+        stream.seek(pos)
+        buffer = stream.read(buffer_size)
+        matches = list(pattern.finditer(buffer + buffer_last))
+        if matches:
+            match = matches[-1]
+            break
+        buffer_last = buffer
+
+    stream.seek(pos_init)
+    return match
+
+
+def reference_log_timedelta(file: Path) -> Optional[dt.timedelta]:
+    """
+    The original get_log_timedelta: read the first line, then seek backwards
+    from the end of the file for the last timestamp. Every fast path is
+    checked against this.
+    """
+    try:
+        if file.suffix == '.gz':
+            log = gzip.open(file, 'rt', errors='ignore')
+        else:
+            log = open(file, 'rt', errors='ignore')
+    except OSError:
+        return None
+    try:
+        start_time = time_pattern.search(log.readline())
+        if start_time is None:
+            return None
+        end_time = reference_find_backwards(log, time_pattern)
+        if end_time is None:
+            return None
+    except (EOFError, OSError):
+        return None
+    finally:
+        log.close()
+
+    start_time = _to_timedelta(start_time)
+    end_time = _to_timedelta(end_time)
+    if end_time < start_time:
+        end_time += dt.timedelta(days=1)
+    return end_time - start_time
+
+
+def full_read_log_timedelta(file: Path) -> Optional[dt.timedelta]:
+    """
+    The slowest but most obviously correct way: decode the whole log and take
+    the last timestamp in it. Used to tell whether a mismatch is a bug in the
+    fast path or in the reference.
+    """
+    try:
+        if file.suffix == '.gz':
+            data = gzip.decompress(file.read_bytes())
+        else:
+            data = file.read_bytes()
+    except (EOFError, OSError):
+        return None
+    log = TextIOWrapper(BytesIO(data), errors='ignore')
+    first_line = log.readline()
+    start_time = time_pattern.search(first_line)
+    if start_time is None:
+        return None
+    end_times = list(time_pattern.finditer(first_line + log.read()))
+    start_time = _to_timedelta(start_time)
+    end_time = _to_timedelta(end_times[-1])
+    if end_time < start_time:
+        end_time += dt.timedelta(days=1)
+    return end_time - start_time
+
+
+def _to_timedelta(match) -> dt.timedelta:
+    return dt.timedelta(
+        hours=int(match['hour']),
+        minutes=int(match['min']),
+        seconds=int(match['sec'])
+    )
+
+
+# Fast paths
+
+def streaming_parser(chunk_size: int, buffer_size: int) -> T_Parser:
+    """
+    The streaming search get_log_timedelta uses for compressed logs, used on
+    every log and with tiny chunks and windows so their edges get hit a lot
+    """
+    def parse(file: Path) -> Optional[dt.timedelta]:
+        try:
+            decoder = get_decoder(file)
+            with TextIOWrapper(decoder.open(file), errors='ignore') as log:
+                first_line = log.readline()
+                start_time = time_pattern.search(first_line)
+                if start_time is None:
+                    return None
+                end_time = find_last(
+                    log, time_pattern, chunk_size, buffer_size
+                )
+                if end_time is None:
+                    end_time = list(time_pattern.finditer(first_line))[-1]
+        except (EOFError, OSError):
+            return None
+        start_time = _to_timedelta(start_time)
+        end_time = _to_timedelta(end_time)
+        if end_time < start_time:
+            end_time += dt.timedelta(days=1)
+        return end_time - start_time
+    return parse
+
+
+time_pattern_bytes = re.compile(
+    rb'\[(?P<hour>\d{2}):(?P<min>\d{2}):(?P<sec>\d{2})\]'
+)
+
+
+def mmap_log_timedelta(file: Path) -> Optional[dt.timedelta]:
+    """
+    Experimental: search the raw bytes of plain logs through mmap, without
+    decoding them
+    """
+    if file.suffix != '.log':
+        return get_log_timedelta(file)
+    with open(file, 'rb') as f:
+        if f.seek(0, SEEK_END) == 0:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            line_end = data.find(b'\n')
+            first_line = data[:line_end + 1 if line_end >= 0 else len(data)]
+            start_time = time_pattern_bytes.search(first_line)
+            if start_time is None:
+                return None
+            end = len(data)
+            while True:
+                start = data.rfind(b'[', 0, end)
+                if start < 0:
+                    return None
+                end_time = time_pattern_bytes.match(data[start:start + 10])
+                if end_time is not None:
+                    break
+                end = start
+    start_time = _to_timedelta(start_time)
+    end_time = _to_timedelta(end_time)
+    if end_time < start_time:
+        end_time += dt.timedelta(days=1)
+    return end_time - start_time
+
+
+FAST_PATHS: Dict[str, T_Parser] = {
+    'get_log_timedelta': get_log_timedelta,
+    'streaming': streaming_parser(1 << 18, 128),
+    'streaming (tiny)': streaming_parser(64, 16),
+    'mmap bytes': mmap_log_timedelta,
+}
+
+
+# Random logs
+
+def random_time(rng: random.Random) -> str:
+    return (
+        f"[{rng.randrange(24):02}:{rng.randrange(60):02}:"
+        f"{rng.randrange(60):02}]"
+    )
+
+
+def random_text(rng: random.Random, length: int) -> str:
+    alphabet = 'abcdefghij []:0123456789<>/.é€😀'
+    return ''.join(rng.choice(alphabet) for _ in range(length))
+
+
+def random_lines(rng: random.Random, lines: int) -> str:
+    return ''.join(
+        f"{random_time(rng)} [Render thread/INFO]: "
+        f"{random_text(rng, rng.randrange(80))}\n"
+        for _ in range(lines)
+    )
+
+
+def case_normal(rng: random.Random) -> bytes:
+    return random_lines(rng, rng.randrange(1, 2000)).encode()
+
+
+def case_buffer_boundary(rng: random.Random) -> bytes:
+    """
+    Put the last timestamp across one of the boundaries find_backwards and
+    find_last read at
+    """
+    data = random_lines(rng, rng.randrange(1, 50)) + random_time(rng)
+    boundary = rng.choice([16, 64, 128, 256, 1 << 18])
+    # Timestamp starts 1 to 9 characters before the boundary
+    tail = boundary - 1 - rng.randrange(1, 10)
+    return (data + 'x' * max(tail, 0) + '\n').encode()
+
+
+def case_long_tail(rng: random.Random) -> bytes:
+    """Lots of text without timestamps after the last one"""
+    data = random_lines(rng, rng.randrange(1, 20))
+    return (data + 'no time here\n' * rng.randrange(1000, 30000)).encode()
+
+
+def case_invalid_utf8(rng: random.Random) -> bytes:
+    data = bytearray(case_normal(rng))
+    for _ in range(rng.randrange(1, 20)):
+        pos = rng.randrange(len(data) + 1)
+        data[pos:pos] = rng.choice([b'\xff', b'\xc3', b'\xe2\x82', b'\x80'])
+    return bytes(data)
+
+
+def case_empty(rng: random.Random) -> bytes:
+    return rng.choice([b'', b'\n', b'no timestamps\n'])
+
+
+def case_single_line(rng: random.Random) -> bytes:
+    line = f"{random_time(rng)} {random_text(rng, 20)}"
+    if rng.random() < 0.5:
+        line += f" {random_time(rng)}"
+    return line.encode() + rng.choice([b'', b'\n'])
+
+
+def case_midnight(rng: random.Random) -> bytes:
+    return (
+        f"[23:{rng.randrange(60):02}:00] start\n"
+        + random_lines(rng, rng.randrange(100))
+        + f"[00:{rng.randrange(60):02}:00] end\n"
+    ).encode()
+
+
+def case_line_endings(rng: random.Random) -> bytes:
+    data = random_lines(rng, rng.randrange(1, 200))
+    return data.replace('\n', rng.choice(['\r\n', '\r'])).encode()
+
+
+CASES: Dict[str, Callable[[random.Random], bytes]] = {
+    'normal': case_normal,
+    'buffer boundary': case_buffer_boundary,
+    'long tail': case_long_tail,
+    'invalid utf-8': case_invalid_utf8,
+    'empty': case_empty,
+    'single line': case_single_line,
+    'midnight rollover': case_midnight,
+    'line endings': case_line_endings,
+}
+
+
+def write_case(
+        rng: random.Random, directory: Path, index: int, data: bytes
+) -> Tuple[Path, str]:
+    """Save a case as a plain, gzipped or truncated gzipped log"""
+    kind = rng.choice(['plain', 'gzip', 'truncated gzip'])
+    if kind == 'plain':
+        file = directory / f'2020-01-01-{index}.log'
+        file.write_bytes(data)
+    else:
+        file = directory / f'2020-01-01-{index}.log.gz'
+        compressed = gzip.compress(data)
+        if kind == 'truncated gzip':
+            compressed = compressed[:rng.randrange(len(compressed))]
+        file.write_bytes(compressed)
+    return file, kind
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cases', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument(
+        '--failures', type=Path, default=None,
+        help="copy logs which give different results into this folder"
+    )
+    args = parser.parse_args()
+
+    seed = args.seed if args.seed is not None else random.randrange(1 << 32)
+    rng = random.Random(seed)
+    print(f"Seed: {seed}")
+
+    # Skipped logs are expected here, so don't spam warnings
+    minecraft_logs.logger.disabled = True
+
+    # Results which differ from the reference
+    mismatches: Dict[Tuple[str, str], int] = defaultdict(int)
+    # ...and which also differ from a full read, so the fast path is wrong
+    # rather than the reference
+    wrong: Dict[Tuple[str, str], int] = defaultdict(int)
+    oracle_time: Dict[str, float] = defaultdict(float)
+    fast_time: Dict[Tuple[str, str], float] = defaultdict(float)
+    counts: Dict[str, int] = defaultdict(int)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        for i in range(args.cases):
+            case = rng.choice(list(CASES))
+            file, kind = write_case(rng, tmp, i, CASES[case](rng))
+            counts[case] += 1
+
+            with Timer() as timer:
+                expected = reference_log_timedelta(file)
+            oracle_time[case] += timer.elapsed
+            truth = None
+
+            for name, parse in FAST_PATHS.items():
+                with Timer() as timer:
+                    try:
+                        result = parse(file)
+                    except Exception as e:
+                        result = e
+                fast_time[case, name] += timer.elapsed
+                if result == expected:
+                    continue
+
+                mismatches[case, name] += 1
+                if truth is None:
+                    truth = full_read_log_timedelta(file)
+                if result == truth:
+                    verdict = "the full read agrees with the fast path"
+                else:
+                    wrong[case, name] += 1
+                    verdict = f"the full read gives {truth}"
+                print(
+                    f"MISMATCH {name} on {case} ({kind}, {file.name}): "
+                    f"expected {expected}, got {result!r}; {verdict}"
+                )
+                if args.failures is not None:
+                    args.failures.mkdir(parents=True, exist_ok=True)
+                    (args.failures / file.name).write_bytes(file.read_bytes())
+            file.unlink()
+
+    print()
+    print(
+        f"{'case':18} {'fast path':18} {'runs':>5} {'differ':>7} "
+        f"{'wrong':>6} {'speedup':>8}"
+    )
+    for case in CASES:
+        for name in FAST_PATHS:
+            if not counts[case]:
+                continue
+            speedup = oracle_time[case] / max(fast_time[case, name], 1e-9)
+            print(
+                f"{case:18} {name:18} {counts[case]:5} "
+                f"{mismatches[case, name]:7} {wrong[case, name]:6} "
+                f"{speedup:7.2f}x"
+            )
+
+    return 1 if any(wrong.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
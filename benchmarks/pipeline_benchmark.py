@@ -0,0 +1,51 @@
+"""
+Compare the asyncio scan pipeline with the sequential scan thread.
+
+Usage: python -m benchmarks.pipeline_benchmark [--files N] [--lines N]
+"""
+
+import argparse
+import asyncio
+from pathlib import Path
+import tempfile
+
+import wx
+
+from minecraft_playtime_calculator.pipeline import scan_playtimes
+from minecraft_playtime_calculator.ui import PlaytimeCounterThread
+from .common import *
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--files', type=int, default=200)
+    parser.add_argument('--lines', type=int, default=20_000)
+    parser.add_argument('--readers', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        logs = Path(tmp)
+        print(f"Writing {args.files} logs of {args.lines} lines...")
+        write_client_logs(logs, args.files, args.lines)
+
+        # Run the thread body synchronously; events go to a bare handler
+        thread = PlaytimeCounterThread(wx.EvtHandler(), [logs])
+        with Timer() as sequential:
+            thread.run()
+        print(
+            f"sequential:      {sequential.elapsed:.3f}s "
+            f"({args.files / sequential.elapsed:.1f} files/s)"
+        )
+
+        for readers in args.readers:
+            with Timer() as pipeline:
+                asyncio.run(scan_playtimes([logs], readers=readers))
+            print(
+                f"pipeline ({readers} readers): {pipeline.elapsed:.3f}s "
+                f"({args.files / pipeline.elapsed:.1f} files/s, "
+                f"{sequential.elapsed / pipeline.elapsed:.2f}x)"
+            )
+
+
+if __name__ == '__main__':
+    main()
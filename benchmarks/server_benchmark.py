@@ -0,0 +1,89 @@
+"""
+Compare how fast server logs are parsed with how fast they're decompressed.
+
+Usage: python -m benchmarks.server_benchmark [--lines N]
+"""
+
+import argparse
+import datetime as dt
+import gzip
+from pathlib import Path
+import random
+import tempfile
+
+from minecraft_playtime_calculator.minecraft_logs import iter_log_chunks
+from minecraft_playtime_calculator.server_logs import ServerLogParser
+from .common import *
+
+PLAYERS = ['Steve', 'Alex', 'Bob', 'Notch']
+# Most lines of a busy server's log aren't join/leave events
+FILLER = [
+    "[Server thread/INFO]: <{player}> hello there how is everyone doing today",
+    "[User Authenticator #1/INFO]: UUID of player {player} is "
+    "1234-5678-90ab-cdef-1234567890ab",
+    "[Server thread/WARN]: Can't keep up! Is the server overloaded? Running "
+    "2047ms or 40 ticks behind",
+    "[Server thread/INFO]: {player} has made the advancement [Getting Wood]",
+]
+
+
+def write_server_log(file: Path, lines: int):
+    online = set()
+    with gzip.open(file, 'wt') as log:
+        log.write(
+            "[00:00:00] [Server thread/INFO]: Starting minecraft server "
+            "version 1.16.5\n"
+        )
+        for i in range(lines):
+            seconds = i * 86399 // lines
+            hour, minute, second = (
+                seconds // 3600, seconds // 60 % 60, seconds % 60
+            )
+            player = random.choice(PLAYERS)
+            if random.random() < 0.001:
+                if player in online:
+                    online.remove(player)
+                    message = f"[Server thread/INFO]: {player} left the game"
+                else:
+                    online.add(player)
+                    message = (
+                        f"[Server thread/INFO]: {player} joined the game"
+                    )
+            else:
+                message = random.choice(FILLER).format(player=player)
+            log.write(f"[{hour:02}:{minute:02}:{second:02}] {message}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--lines', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        file = Path(tmp) / '2020-01-01-1.log.gz'
+        write_server_log(file, args.lines)
+        size_mb = sum(map(len, iter_log_chunks(file))) / 1e6
+        print(f"Sample log: {size_mb:.1f} MB decompressed\n")
+
+        read_time = parse_time = float('inf')
+        for _ in range(args.repeat):
+            with Timer() as read:
+                for _ in iter_log_chunks(file):
+                    pass
+            with Timer() as parse:
+                log_parser = ServerLogParser()
+                log_parser.feed(file, dt.date(2020, 1, 1))
+                log_parser.close()
+            read_time = min(read_time, read.elapsed)
+            parse_time = min(parse_time, parse.elapsed)
+
+        print(f"decompress {size_mb / read_time:8.1f} MB/s")
+        print(
+            f"parse      {size_mb / parse_time:8.1f} MB/s "
+            f"({parse_time / read_time:.2f}x the decompression time)"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -4,5 +4,18 @@ try:
 except:
     pass
 
+from .intervals import *
 from .minecraft_logs import *
-from .ui import MinecraftPlaytimeCalculatorFrame
+from .pipeline import *
+from .server_logs import *
+from .snapshot import *
+from .throttle import *
+
+
+def __getattr__(name):
+    # The UI needs wxPython, which scanning logs doesn't, so it's only
+    # imported when it's used
+    if name == 'MinecraftPlaytimeCalculatorFrame':
+        from .ui import MinecraftPlaytimeCalculatorFrame
+        return MinecraftPlaytimeCalculatorFrame
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
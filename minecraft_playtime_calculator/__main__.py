@@ -1,8 +1,18 @@
-import wx
+import sys
 
-from .ui import MinecraftPlaytimeCalculatorFrame
+from .server_logs import main as server_main
+from .snapshot import main as snapshot_main
 
 if __name__ == '__main__':
+    if sys.argv[1:2] == ['server']:
+        sys.exit(server_main(sys.argv[2:]))
+    if sys.argv[1:2] == ['snapshot']:
+        sys.exit(snapshot_main(sys.argv[2:]))
+
+    # Only the UI needs wxPython, which servers often don't have installed
+    import wx
+    from .ui import MinecraftPlaytimeCalculatorFrame
+
     app = wx.App(redirect=False, useBestVisual=True)
     frame = MinecraftPlaytimeCalculatorFrame()
     app.MainLoop()
@@ -0,0 +1,22 @@
+import os
+from pathlib import Path
+import sys
+
+__all__ = ['get_app_data_path']
+
+
+def get_app_data_path() -> Path:
+    """
+    Get the folder this program stores its own data in. It isn't created if
+    it doesn't exist yet.
+    """
+    platform = sys.platform
+    if platform == 'win32':
+        base = Path(os.environ['APPDATA'])
+    elif platform == 'darwin':
+        base = Path.home() / 'Library/Application Support'
+    else:
+        base = Path(
+            os.environ.get('XDG_DATA_HOME') or Path.home() / '.local/share'
+        )
+    return base / 'minecraft_playtime_calculator'
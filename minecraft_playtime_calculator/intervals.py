@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from collections import defaultdict
+import datetime as dt
+from typing import *
+
+__all__ = [
+    'merge_intervals', 'split_by_day', 'PlaytimeIntervals'
+]
+
+T_Interval = Tuple[dt.datetime, dt.datetime]
+T_TimePerDay = List[Tuple[dt.date, dt.timedelta]]
+
+ONE_DAY = dt.timedelta(days=1)
+ONE_HOUR = dt.timedelta(hours=1)
+
+
+def merge_intervals(intervals: Iterable[T_Interval]) -> List[T_Interval]:
+    """
+    Merge overlapping intervals, so time covered by more than one of them
+    (like two game instances open at once) is only counted once
+
+    :return: sorted, non-overlapping intervals
+    """
+    merged: List[T_Interval] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _split(
+        start: dt.datetime, end: dt.datetime,
+        next_boundary: Callable[[dt.datetime], dt.datetime]
+) -> Generator[T_Interval]:
+    while start < end:
+        boundary = min(next_boundary(start), end)
+        yield start, boundary
+        start = boundary
+
+
+def _next_midnight(time: dt.datetime) -> dt.datetime:
+    return dt.datetime.combine(time.date() + ONE_DAY, dt.time())
+
+
+def _next_hour(time: dt.datetime) -> dt.datetime:
+    return time.replace(minute=0, second=0, microsecond=0) + ONE_HOUR
+
+
+def split_by_day(
+        intervals: Iterable[T_Interval]
+) -> Dict[dt.date, dt.timedelta]:
+    """
+    Sum up the time in each day. Intervals which cross midnight are split
+    between the days they cover.
+    """
+    days: Dict[dt.date, dt.timedelta] = defaultdict(dt.timedelta)
+    for start, end in intervals:
+        for part_start, part_end in _split(start, end, _next_midnight):
+            days[part_start.date()] += part_end - part_start
+    return days
+
+
+class PlaytimeIntervals:
+    """
+    Absolute play sessions, merged into non-overlapping intervals when
+    needed. The merge is cached until more sessions are added.
+    """
+
+    def __init__(self, intervals: Iterable[T_Interval] = ()):
+        self._intervals: List[T_Interval] = list(intervals)
+        self._merged: Optional[List[T_Interval]] = None
+
+    def __len__(self):
+        return len(self._intervals)
+
+    def add(self, start: dt.datetime, end: dt.datetime):
+        self._intervals.append((start, end))
+        self._merged = None
+
+    def extend(self, intervals: Iterable[T_Interval]):
+        self._intervals.extend(intervals)
+        self._merged = None
+
+    def merged(self) -> List[T_Interval]:
+        if self._merged is None:
+            self._merged = merge_intervals(self._intervals)
+        return self._merged
+
+    def total(self) -> dt.timedelta:
+        return sum(
+            (end - start for start, end in self.merged()), dt.timedelta()
+        )
+
+    def per_day(self) -> T_TimePerDay:
+        """Get a sorted list of playtime per day"""
+        return list(sorted(split_by_day(self.merged()).items()))
+
+    def hour_histogram(self) -> List[dt.timedelta]:
+        """Get the playtime in each hour of the day (index 0 is midnight)"""
+        hours = [dt.timedelta()] * 24
+        for start, end in self.merged():
+            for part_start, part_end in _split(start, end, _next_hour):
+                hours[part_start.hour] += part_end - part_start
+        return hours
+
+    def weekday_histogram(self) -> List[dt.timedelta]:
+        """Get the playtime on each day of the week (index 0 is Monday)"""
+        weekdays = [dt.timedelta()] * 7
+        for date, time in split_by_day(self.merged()).items():
+            weekdays[date.weekday()] += time
+        return weekdays
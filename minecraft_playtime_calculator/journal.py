@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import datetime as dt
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import *
+
+from .app_data import get_app_data_path
+
+__all__ = [
+    'JournalEntry', 'ScanJournal'
+]
+
+logger = logging.getLogger('minecraft_logs_analyzer.journal')
+
+
+class JournalEntry(NamedTuple):
+    file: str
+    size: int
+    mtime_ns: int
+    # Start and end of the log, or None if it couldn't be read
+    interval: Optional[Tuple[dt.datetime, dt.datetime]]
+
+    def matches(self, stat: os.stat_result) -> bool:
+        """Check if the log is unchanged since it was journaled"""
+        return self.size == stat.st_size and self.mtime_ns == stat.st_mtime_ns
+
+    def to_json(self) -> str:
+        if self.interval is None:
+            start = end = None
+        else:
+            start, end = (t.isoformat() for t in self.interval)
+        return json.dumps([self.file, self.size, self.mtime_ns, start, end])
+
+    @classmethod
+    def from_json(cls, line: str) -> JournalEntry:
+        file, size, mtime_ns, start, end = json.loads(line)
+        interval = None
+        if start is not None:
+            interval = tuple(
+                dt.datetime.fromisoformat(t) for t in (start, end)
+            )
+        return cls(file, size, mtime_ns, interval)
+
+
+class ScanJournal:
+    """
+    Append-only record of the logs a scan has finished, so an interrupted
+    scan can be resumed.
+
+    The first line of the journal is a header identifying the scan inputs,
+    followed by one JSON line per log. A scan which finished is compacted and
+    marked complete, and can't be resumed.
+    """
+
+    version = 2
+
+    def __init__(self, path: Path, inputs: Iterable[Path]):
+        self.path = path
+        self.inputs = [str(p) for p in inputs]
+        self._file: Optional[TextIO] = None
+
+    @classmethod
+    def for_inputs(cls, inputs: Iterable[Path]) -> ScanJournal:
+        """Get the journal used for scans of these paths"""
+        inputs = list(inputs)
+        key = hashlib.sha1(
+            '\n'.join(sorted(str(p) for p in inputs)).encode()
+        ).hexdigest()[:16]
+        path = get_app_data_path() / 'journals' / f'{key}.jsonl'
+        return cls(path, inputs)
+
+    def _header(self, complete: bool = False) -> str:
+        return json.dumps({
+            'version': self.version, 'inputs': sorted(self.inputs),
+            'complete': complete
+        })
+
+    def _read(self) -> Tuple[Optional[dict], Dict[str, JournalEntry]]:
+        """
+        Read the header and entries in one pass. Later entries for a file
+        replace earlier ones. A partly written last line (from a crash) is
+        ignored.
+        """
+        entries: Dict[str, JournalEntry] = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                try:
+                    header = json.loads(f.readline())
+                except ValueError:
+                    return None, entries
+                if (not isinstance(header, dict)
+                        or header.get('version') != self.version
+                        or header.get('inputs') != sorted(self.inputs)):
+                    return None, entries
+                for line in f:
+                    try:
+                        entry = JournalEntry.from_json(line)
+                    except (ValueError, TypeError):
+                        continue
+                    entries[entry.file] = entry
+        except FileNotFoundError:
+            return None, entries
+        return header, entries
+
+    def load_unfinished(self) -> Optional[Dict[str, JournalEntry]]:
+        """
+        Get the journaled logs by path, if there is an unfinished scan of the
+        same inputs which can be resumed
+        """
+        header, entries = self._read()
+        if header is None or header['complete'] or not entries:
+            return None
+        return entries
+
+    def open(self, resume: bool = False):
+        """
+        Open the journal for appending
+
+        :param resume: keep the existing entries, which must have been checked
+            with :meth:`load_unfinished`. Otherwise the journal is started
+            from scratch.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if resume:
+            self._file = open(self.path, 'a', encoding='utf-8')
+            return
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._file.write(self._header() + '\n')
+        self._file.flush()
+
+    def append(
+            self, file: Path, stat: os.stat_result,
+            interval: Optional[Tuple[dt.datetime, dt.datetime]]
+    ):
+        """
+        :param stat: the log's stat from before it was read, so the entry
+            matches what was scanned
+        """
+        entry = JournalEntry(
+            str(file), stat.st_size, stat.st_mtime_ns, interval
+        )
+        self._file.write(entry.to_json() + '\n')
+        # Flush each line so a crash loses as little as possible
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def compact(self):
+        """
+        Rewrite the journal with one entry per log and mark the scan
+        complete
+        """
+        self.close()
+        header, entries = self._read()
+        if header is None:
+            return
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self._header(complete=True) + '\n')
+            for entry in entries.values():
+                f.write(entry.to_json() + '\n')
+        os.replace(tmp_path, self.path)
+
+    def delete(self):
+        self.close()
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
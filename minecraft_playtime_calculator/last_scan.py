@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import datetime as dt
+from glob import iglob
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import *
+
+from .app_data import get_app_data_path
+from .intervals import T_TimePerDay
+from .minecraft_logs import iter_logs
+
+__all__ = [
+    'LastScan', 'get_log_set_fingerprint', 'scan_log_set', 'expand_globs'
+]
+
+logger = logging.getLogger('minecraft_logs_analyzer.last_scan')
+
+# Path, size and modification time of a log
+T_LogStat = Tuple[str, int, int]
+
+
+def get_log_set_fingerprint(log_stats: Iterable[T_LogStat]) -> str:
+    """
+    Identify a set of logs by their paths, sizes and modification times. The
+    order they're given in doesn't matter.
+    """
+    digest = hashlib.sha1()
+    for path, size, mtime_ns in sorted(log_stats):
+        digest.update(f'{path}\0{size}\0{mtime_ns}\n'.encode())
+    return digest.hexdigest()
+
+
+def expand_globs(globs: Iterable[str]) -> List[Path]:
+    """Find the files and folders matching any of these globs"""
+    paths = []
+    for glob in globs:
+        for path in iglob(glob.strip(' '), recursive=True):
+            paths.append(Path(path))
+    return paths
+
+
+def scan_log_set(paths: Iterable[Union[str, Path]]) -> Tuple[str, int]:
+    """
+    Fingerprint the logs in these folders without reading them
+
+    :return: a tuple of (fingerprint, number of logs)
+    """
+    log_stats = []
+    for path in paths:
+        for file, date in iter_logs(path):
+            stat = file.stat()
+            log_stats.append((str(file), stat.st_size, stat.st_mtime_ns))
+    return get_log_set_fingerprint(log_stats), len(log_stats)
+
+
+class LastScan(NamedTuple):
+    """
+    The results of the last completed scan, which are shown straight away
+    the next time the program starts
+    """
+
+    # Folders or files scanned, or the globs they were found with
+    inputs: List[str]
+    # Fingerprint of the logs which were scanned
+    fingerprint: str
+    log_count: int
+    finished: dt.datetime
+    total_time: dt.timedelta
+    time_per_day: T_TimePerDay
+    # Whether the inputs are globs, which are expanded again to check for
+    # new logs
+    globs: bool = False
+
+    version = 1
+
+    @staticmethod
+    def default_path() -> Path:
+        return get_app_data_path() / 'last_scan.json'
+
+    def save(self, path: Optional[Path] = None):
+        if path is None:
+            path = self.default_path()
+        data = {
+            'version': self.version,
+            'inputs': self.inputs,
+            'globs': self.globs,
+            'fingerprint': self.fingerprint,
+            'log_count': self.log_count,
+            'finished': self.finished.isoformat(timespec='seconds'),
+            'total_seconds': int(self.total_time.total_seconds()),
+            'dates': [date.toordinal() for date, _ in self.time_per_day],
+            'seconds': [int(t.total_seconds()) for _, t in self.time_per_day],
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first so a crash can't leave half a file
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> Optional[LastScan]:
+        """
+        :return: the last scan, or None if there isn't one (or it's from a
+            different version of this program)
+        """
+        if path is None:
+            path = cls.default_path()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            logger.warning("Unable to read the last scan", exc_info=True)
+            return None
+
+        if not isinstance(data, dict) or data.get('version') != cls.version:
+            return None
+        try:
+            time_per_day = [
+                (dt.date.fromordinal(date), dt.timedelta(seconds=seconds))
+                for date, seconds in zip(data['dates'], data['seconds'])
+            ]
+            return cls(
+                list(data['inputs']), str(data['fingerprint']),
+                int(data['log_count']),
+                dt.datetime.fromisoformat(data['finished']),
+                dt.timedelta(seconds=data['total_seconds']), time_per_day,
+                bool(data.get('globs', False))
+            )
+        except (KeyError, ValueError, TypeError, OverflowError):
+            logger.warning(
+                "The last scan is damaged; ignoring it", exc_info=True
+            )
+            return None
+
+    def logs_changed(self) -> Tuple[bool, int]:
+        """
+        Check if any logs were added, removed or modified since the scan.
+        Only the file system metadata is read.
+
+        :return: a tuple of (whether anything changed, number of logs now)
+        """
+        paths = self.inputs
+        if self.globs:
+            paths = expand_globs(paths)
+        fingerprint, log_count = scan_log_set(paths)
+        return fingerprint != self.fingerprint, log_count
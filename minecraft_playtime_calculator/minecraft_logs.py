@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import bz2
 import datetime as dt
-from io import SEEK_END
+from io import SEEK_END, BufferedReader, TextIOWrapper
 import gzip
+import importlib.util
 import logging
+import lzma
 import os
 import re
 from pathlib import Path
@@ -12,16 +15,144 @@ from typing import *
 from typing import Match, Pattern
 
 __all__ = [
-    'iter_logs', 'get_log_timedelta', 'get_default_logs_path'
+    'iter_logs', 'get_log_timedelta', 'get_log_interval',
+    'get_default_logs_path',
+    'LogDecoder', 'register_decoder', 'get_decoder', 'get_decoders',
+    'iter_log_chunks'
 ]
 
 logger = logging.getLogger('minecraft_logs_analyzer.minecraft_logs')
 
-log_name_pattern = re.compile(r'(?P<date>\d{4}-\d\d-\d\d)-\d+\.log(?:\.gz)?')
+log_name_pattern = re.compile(
+    r'(?P<date>\d{4}-\d\d-\d\d)-(?P<index>\d+)\.log(?:\.\w+)?'
+)
 time_pattern = re.compile(
     r'\[(?P<hour>\d{2}):(?P<min>\d{2}):(?P<sec>\d{2})\]'
 )
 
+# Size of the decompressed chunks compressed logs are streamed in
+CHUNK_SIZE = 1 << 18
+
+
+class LogDecoder(NamedTuple):
+    name: str
+    # Opens a binary stream of the decompressed log
+    open: Callable[[Path], BinaryIO]
+    # Whether seeking near the end of the stream is cheap. Compressed streams
+    # have to decompress everything before the new position on every seek,
+    # so their end is found by streaming through them instead.
+    seekable: bool = False
+
+
+_decoders: Dict[str, LogDecoder] = {}
+_decoders_by_suffix: Dict[str, LogDecoder] = {}
+_decoders_by_magic: Dict[bytes, LogDecoder] = {}
+
+
+def register_decoder(
+        decoder: LogDecoder, suffixes: Iterable[str] = (),
+        magic: Optional[bytes] = None
+):
+    """
+    Add a way to read log files. Registering a decoder for a suffix or magic
+    number which is already registered replaces the old decoder.
+
+    :param decoder: the decoder to register
+    :param suffixes: file suffixes (like ``'.gz'``) this decoder reads
+    :param magic: bytes that files this decoder reads start with. They're
+        checked before the suffix, so logs compressed without being renamed
+        are still read.
+    """
+    _decoders[decoder.name] = decoder
+    for suffix in suffixes:
+        _decoders_by_suffix[suffix] = decoder
+    if magic is not None:
+        _decoders_by_magic[magic] = decoder
+
+
+def get_decoders() -> Dict[str, LogDecoder]:
+    """Get all registered decoders by name"""
+    return dict(_decoders)
+
+
+def get_decoder(file: Path) -> Optional[LogDecoder]:
+    """
+    Find the decoder for a log file. The file's magic number is checked first
+    in case it was compressed without being renamed, then its suffix.
+    """
+    with open(file, 'rb') as f:
+        header = f.read(max(map(len, _decoders_by_magic), default=0))
+    for magic, decoder in _decoders_by_magic.items():
+        if header.startswith(magic):
+            return decoder
+    return _decoders_by_suffix.get(file.suffix)
+
+
+def _open_zstd(file: Path) -> BinaryIO:
+    try:
+        # Python 3.14+
+        from compression import zstd
+        return zstd.open(file, 'rb')
+    except ImportError:
+        import zstandard
+        # Files can have several frames, like ones written by pzstd or
+        # concatenated together
+        reader = zstandard.ZstdDecompressor().stream_reader(
+            open(file, 'rb'), closefd=True, read_across_frames=True
+        )
+        # noinspection PyTypeChecker
+        return BufferedReader(reader)
+
+
+def _get_gzip_decoder() -> LogDecoder:
+    """Use the fastest gzip implementation that's installed"""
+    try:
+        from isal import igzip
+        return LogDecoder('gzip (isal)', lambda file: igzip.open(file, 'rb'))
+    except ImportError:
+        pass
+    try:
+        from zlib_ng import gzip_ng
+        return LogDecoder(
+            'gzip (zlib-ng)', lambda file: gzip_ng.open(file, 'rb')
+        )
+    except ImportError:
+        pass
+    return LogDecoder('gzip', lambda file: gzip.open(file, 'rb'))
+
+
+def _zstd_available() -> bool:
+    # Check without importing; the decoder imports whichever is found when
+    # it's first used
+    for module in ('compression.zstd', 'zstandard'):
+        try:
+            if importlib.util.find_spec(module) is not None:
+                return True
+        except ModuleNotFoundError:
+            # The parent package (compression, before Python 3.14) is missing
+            pass
+    return False
+
+
+register_decoder(
+    LogDecoder('plain', lambda file: open(file, 'rb'), seekable=True),
+    suffixes=['.log']
+)
+register_decoder(_get_gzip_decoder(), suffixes=['.gz'], magic=b'\x1f\x8b')
+register_decoder(
+    LogDecoder('bzip2', lambda file: bz2.open(file, 'rb')),
+    suffixes=['.bz2'], magic=b'BZh'
+)
+register_decoder(
+    LogDecoder('xz', lambda file: lzma.open(file, 'rb')),
+    suffixes=['.xz', '.lzma'], magic=b'\xfd7zXZ\x00'
+)
+if _zstd_available():
+    register_decoder(
+        LogDecoder('zstd', _open_zstd),
+        suffixes=['.zst'], magic=b'\x28\xb5\x2f\xfd'
+    )
+
 
 def get_file_creation_time(file: Path) -> dt.datetime:
     # On Unix, this is "the time of most recent metadata change"
@@ -63,16 +194,21 @@ def get_default_logs_path() -> Optional[Path]:
 def find_backwards(
         stream: TextIO, pattern: Pattern, buffer_size: int = 128
 ) -> Optional[Match]:
+    # Text streams are read by character but seeked by byte, so reading
+    # windows of text from byte positions makes them overlap when there are
+    # multibyte characters. The underlying bytes are searched instead.
     pos_init = stream.tell()
-    pos = stream.seek(0, SEEK_END)
-    buffer_last = ''
+    binary = stream.buffer
+    pos = binary.seek(0, SEEK_END)
+    buffer_last = b''
     match = None
 
     while pos > 0:
         pos = max(pos - buffer_size, 0)
-        stream.seek(pos)
-        buffer = stream.read(buffer_size)
-        matches = list(pattern.finditer(buffer + buffer_last))
+        binary.seek(pos)
+        buffer = binary.read(buffer_size)
+        text = (buffer + buffer_last).decode(stream.encoding, errors='ignore')
+        matches = list(pattern.finditer(text))
         if matches:
             match = matches[-1]
             break
@@ -86,6 +222,8 @@ def parse_log_name(file: Path) -> Optional[dt.date]:
     name_match = log_name_pattern.fullmatch(file.name)
     if not name_match:
         return None
+    if file.suffix not in _decoders_by_suffix:
+        return None
     return dt.date.fromisoformat(name_match.group('date'))
 
 
@@ -113,50 +251,107 @@ def iter_logs(dir_or_file: Union[str, Path]) -> Generator[Tuple[Path, dt.date]]:
         yield latest, date
 
 
-def open_log(file: Path) -> TextIO:
-    if file.suffix == '.gz':
-        return gzip.open(file, 'rt', errors='ignore')
-    if file.suffix == '.log':
-        # noinspection PyTypeChecker
-        return open(file, 'rt', errors='ignore')
+def iter_log_chunks(
+        file: Path, chunk_size: int = CHUNK_SIZE
+) -> Generator[bytes]:
+    """Stream the decompressed contents of a log in chunks"""
+    decoder = get_decoder(file)
+    if decoder is None:
+        raise ValueError(f"Unsupported log file: {file.name}")
+    with decoder.open(file) as stream:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
 
 
-def get_log_timedelta(log: Path) -> Optional[dt.timedelta]:
+def find_last(
+        stream: TextIO, pattern: Pattern, chunk_size: int = CHUNK_SIZE,
+        buffer_size: int = 128
+) -> Optional[Match]:
+    """
+    Find the last match of a pattern by reading the rest of the stream
+    forwards. Only the end of each chunk is searched unless it has no match.
+    """
+    match = None
+    # Keep the end of the last chunk so matches split between chunks are found
+    buffer_last = ''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return match
+        buffer = buffer_last + chunk
+        pos = len(buffer)
+        while pos > 0:
+            pos = max(pos - buffer_size, 0)
+            # Overlap the previous window so matches on its edge are found
+            matches = list(
+                pattern.finditer(buffer, pos, pos + 2 * buffer_size)
+            )
+            if matches:
+                match = matches[-1]
+                break
+        buffer_last = buffer[-buffer_size:]
+
+
+def get_log_times(
+        file: Path
+) -> Optional[Tuple[dt.timedelta, dt.timedelta]]:
+    """
+    Get the times of day a log starts and ends at. If the log goes past
+    midnight, the end time is more than a day.
+    """
+    log = None
     try:
-        log = open_log(log)
-        start_time = time_pattern.search(log.readline())
+        decoder = get_decoder(file)
+        if decoder is None:
+            logger.warning(
+                f"Unsupported log file; skipping (file={file.name})"
+            )
+            return
+        log = TextIOWrapper(decoder.open(file), errors='ignore')
+        first_line = log.readline()
+        start_time = time_pattern.search(first_line)
         if start_time is None:
             logger.warning(
-                f"Unable to find start time; skipping (file={log.name})"
+                f"Unable to find start time; skipping (file={file.name})"
             )
             return
-        end_time = find_backwards(log, time_pattern)
+        if decoder.seekable:
+            end_time = find_backwards(log, time_pattern)
+        else:
+            end_time = find_last(log, time_pattern)
+            if end_time is None:
+                # The first line is the only one with a timestamp
+                end_time = list(time_pattern.finditer(first_line))[-1]
         if end_time is None:
             logger.warning(
-                f"Unable to find end time; skipping (file={log.name})"
+                f"Unable to find end time; skipping (file={file.name})"
             )
             return
     except EOFError:
         logger.warning(
-            f"Log file may be corrupted; skipping (file={log.name})"
+            f"Log file may be corrupted; skipping (file={file.name})"
         )
         return
     except OSError:
         logger.warning(
             f"Log file may be corrupted or is unable to be opened; "
-            f"skipping (file={log.name})",
+            f"skipping (file={file.name})",
             exc_info=True
         )
         return
     except:
         logger.warning(
             f"Unexpected error while reading log file; skipping "
-            f"(file={log.name})",
+            f"(file={file.name})",
             exc_info=True
         )
         return
     finally:
-        log.close()
+        if log is not None:
+            log.close()
 
     start_time = dt.timedelta(
         hours=int(start_time['hour']),
@@ -171,4 +366,29 @@ def get_log_timedelta(log: Path) -> Optional[dt.timedelta]:
 
     if end_time < start_time:
         end_time += dt.timedelta(days=1)
+    return start_time, end_time
+
+
+def get_log_timedelta(file: Path) -> Optional[dt.timedelta]:
+    times = get_log_times(file)
+    if times is None:
+        return None
+    start_time, end_time = times
     return end_time - start_time
+
+
+def get_log_interval(
+        file: Path, date: dt.date
+) -> Optional[Tuple[dt.datetime, dt.datetime]]:
+    """
+    Get the absolute start and end of a log
+
+    :param file: the log file
+    :param date: the date the log starts on, as found by :func:`iter_logs`
+    """
+    times = get_log_times(file)
+    if times is None:
+        return None
+    start_time, end_time = times
+    midnight = dt.datetime.combine(date, dt.time())
+    return midnight + start_time, midnight + end_time
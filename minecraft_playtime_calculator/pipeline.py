@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor
+import datetime as dt
+import logging
+from pathlib import Path
+import time
+from typing import *
+
+from .intervals import PlaytimeIntervals, split_by_day
+from .minecraft_logs import get_log_interval, iter_logs
+from .throttle import ScanThrottle
+
+__all__ = [
+    'LogResult', 'iter_log_results', 'scan_playtimes'
+]
+
+logger = logging.getLogger('minecraft_logs_analyzer.pipeline')
+
+# Marks the end of a queue
+_DONE = object()
+
+
+class _ReaderError(NamedTuple):
+    error: Exception
+
+
+class LogResult(NamedTuple):
+    file: Path
+    date: dt.date
+    start: dt.datetime
+    end: dt.datetime
+
+    @property
+    def delta(self) -> dt.timedelta:
+        return self.end - self.start
+
+
+async def _discover(
+        paths: Iterable[Union[str, Path]], files: asyncio.Queue,
+        executor: Optional[Executor], readers: int
+):
+    loop = asyncio.get_running_loop()
+    error = None
+    try:
+        for path in paths:
+            # Directory listings block, so they're done off the event loop
+            logs = await loop.run_in_executor(
+                executor, lambda: list(iter_logs(path))
+            )
+            for log in logs:
+                # Blocks while the readers are behind (backpressure)
+                await files.put(log)
+    except Exception as e:
+        # Still let the readers finish; the error is raised to the consumer
+        # once they have
+        error = e
+    for _ in range(readers):
+        await files.put(_DONE)
+    if error is not None:
+        raise error
+
+
+def _read_log(
+        file: Path, date: dt.date, throttle: Optional[ScanThrottle]
+) -> Optional[Tuple[dt.datetime, dt.datetime]]:
+    if throttle is not None and not throttle.wait_for_file(file):
+        return None
+    return get_log_interval(file, date)
+
+
+async def _read(
+        files: asyncio.Queue, results: asyncio.Queue,
+        executor: Optional[Executor], throttle: Optional[ScanThrottle]
+):
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            log = await files.get()
+            if log is _DONE:
+                break
+            file, date = log
+            interval = await loop.run_in_executor(
+                executor, _read_log, file, date, throttle
+            )
+            if interval is None:
+                continue
+            await results.put(LogResult(file, date, *interval))
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        # Hand the error to the consumer, which would otherwise wait forever
+        # for this reader to finish
+        await results.put(_ReaderError(e))
+        return
+    await results.put(_DONE)
+
+
+async def iter_log_results(
+        paths: Iterable[Union[str, Path]], *,
+        executor: Optional[Executor] = None, readers: int = 4,
+        queue_size: int = 64, throttle: Optional[ScanThrottle] = None
+) -> AsyncGenerator[LogResult, None]:
+    """
+    Scan logs with discovery, reading and aggregation running concurrently.
+    Blocking reads and decompression are run in an executor, and each stage is
+    connected by a bounded queue so a slow consumer throttles the stages before
+    it.
+
+    Results are yielded in completion order, not in the order the logs were
+    found.
+
+    :param paths: folders or log files to scan
+    :param executor: executor to run blocking work in. Defaults to the event
+        loop's default executor.
+    :param readers: number of logs to read concurrently
+    :param queue_size: maximum number of items waiting between stages
+    :param throttle: limits on how fast logs are read. If the scan ends
+        early, the throttle is cancelled to release the readers.
+    """
+    own_executor = None
+    if executor is None and throttle is not None and throttle.low_priority:
+        # Priority is lowered per thread, so the event loop's default
+        # executor can't be used
+        executor = own_executor = ThreadPoolExecutor(
+            readers, initializer=throttle.enter_thread
+        )
+
+    files = asyncio.Queue(queue_size)
+    results = asyncio.Queue(queue_size)
+    tasks = [
+        asyncio.create_task(_discover(paths, files, executor, readers))
+    ]
+    tasks.extend(
+        asyncio.create_task(_read(files, results, executor, throttle))
+        for _ in range(readers)
+    )
+
+    finished = False
+    try:
+        readers_running = readers
+        while readers_running:
+            result = await results.get()
+            if result is _DONE:
+                readers_running -= 1
+                continue
+            if isinstance(result, _ReaderError):
+                raise result.error
+            yield result
+        # Surface any error raised during discovery
+        await asyncio.gather(*tasks)
+        finished = True
+    finally:
+        if throttle is not None and not finished:
+            throttle.cancel()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if own_executor is not None:
+            own_executor.shutdown(wait=False)
+
+
+async def scan_playtimes(
+        paths: Iterable[Union[str, Path]], **kwargs
+) -> Tuple[dt.timedelta, Dict[dt.date, dt.timedelta]]:
+    """
+    Sum up playtime per day using :func:`iter_log_results`. Overlapping
+    sessions are only counted once.
+
+    :return: a tuple of (total playtime, playtime per day)
+    """
+    intervals = PlaytimeIntervals()
+    start = time.monotonic()
+    async for result in iter_log_results(paths, **kwargs):
+        logger.info(f"{result.file.name} {result.delta}")
+        intervals.add(result.start, result.end)
+    throttle = kwargs.get('throttle')
+    if throttle is not None:
+        throttle.log_summary(
+            time.monotonic() - start, kwargs.get('readers', 4)
+        )
+    return intervals.total(), split_by_day(intervals.merged())
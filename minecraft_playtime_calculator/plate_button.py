@@ -13,6 +13,10 @@ class PlateButton(PlateButtonBase):
     had to be copy/pasted.
 
     Thanks to wx.lib.checkbox for the EVT_SIZE smearing fix.
+
+    Each state of the button is rendered once to a bitmap, which is reused
+    until the size, display scale, label or enabled state changes, so
+    painting is just a blit.
     """
 
     def __init__(self, parent, id=wx.ID_ANY, label='', bmp=None,
@@ -24,9 +28,14 @@ class PlateButton(PlateButtonBase):
         :keyword wx.Bitmap `bmp`: Buttons bitmap
         :keyword `style`: Button style
         """
+        # Rendered button bitmaps by state, valid for _render_cache_key
+        self._render_cache = {}
+        self._render_cache_key = None
+        self._refresh_pending = False
+
         super().__init__(parent, id, label, bmp, pos, size, style, name)
 
-        self.Bind(wx.EVT_SIZE, lambda evt: self.Refresh())
+        self.Bind(wx.EVT_SIZE, lambda evt: self.__ScheduleRefresh())
 
         self.Unbind(wx.EVT_LEAVE_WINDOW)
         self.Bind(
@@ -36,6 +45,62 @@ class PlateButton(PlateButtonBase):
             lambda evt: self.__LeaveWindow()
         )
 
+    def __ScheduleRefresh(self):
+        """
+        Refresh once after the current batch of events, rather than on every
+        event (dragging the window edge sends lots of size events)
+        """
+        if self._refresh_pending:
+            return
+        self._refresh_pending = True
+        wx.CallAfter(self.__RefreshNow)
+
+    def __RefreshNow(self):
+        self._refresh_pending = False
+        # The button may have been destroyed in the meantime
+        if self:
+            self.Refresh()
+
+    def InvalidateCache(self):
+        """Throw away all rendered bitmaps so the button is redrawn"""
+        self._render_cache.clear()
+
+    def SetBackgroundColour(self, colour):
+        self.InvalidateCache()
+        return super().SetBackgroundColour(colour)
+
+    def SetForegroundColour(self, colour):
+        self.InvalidateCache()
+        return super().SetForegroundColour(colour)
+
+    def SetFont(self, font):
+        self.InvalidateCache()
+        return super().SetFont(font)
+
+    def SetBitmap(self, bmp):
+        self.InvalidateCache()
+        return super().SetBitmap(bmp)
+
+    def SetBitmapDisabled(self, bmp):
+        self.InvalidateCache()
+        return super().SetBitmapDisabled(bmp)
+
+    def SetLabelColor(self, normal, hlight=wx.NullColour):
+        self.InvalidateCache()
+        return super().SetLabelColor(normal, hlight)
+
+    def SetMenu(self, menu):
+        self.InvalidateCache()
+        return super().SetMenu(menu)
+
+    def SetPressColor(self, color):
+        self.InvalidateCache()
+        return super().SetPressColor(color)
+
+    def SetWindowStyle(self, style):
+        self.InvalidateCache()
+        return super().SetWindowStyle(style)
+
     def __DrawBitmap(self, gc):
         """Draw the bitmap if one has been set
 
@@ -67,7 +132,44 @@ class PlateButton(PlateButtonBase):
         else:
             dc = wx.AutoBufferedPaintDCFactory(self)
 
-        gc = wx.GCDC(dc)
+        if (PB_STYLE_NOBG & self._style
+                or wx.Platform not in ['__WXGTK__', '__WXMSW__']):
+            # The background is transparent, so it has to be drawn every time
+            self.__RenderButton(dc, wx.GCDC(dc))
+            return
+
+        dc.DrawBitmap(self.__GetRenderedButton(), 0, 0)
+
+    def __GetRenderedButton(self) -> wx.Bitmap:
+        """Get the bitmap of the button in its current state"""
+        width, height = self.GetSize()
+        scale = self.GetContentScaleFactor()
+        key = ((width, height), scale, self.Label, self.IsEnabled())
+        if key != self._render_cache_key:
+            self._render_cache.clear()
+            self._render_cache_key = key
+
+        state = self._state['cur']
+        bmp = self._render_cache.get(state)
+        if bmp is None:
+            # Render at the display's resolution so the button isn't upscaled
+            # (and blurry) on HiDPI screens. The size is still given in
+            # logical pixels.
+            bmp = wx.Bitmap()
+            bmp.CreateScaled(
+                max(width, 1), max(height, 1), wx.BITMAP_SCREEN_DEPTH, scale
+            )
+            dc = wx.MemoryDC(bmp)
+            gc = wx.GCDC(dc)
+            self.__RenderButton(dc, gc)
+            # Make sure everything is flushed to the bitmap
+            del gc
+            dc.SelectObject(wx.NullBitmap)
+            self._render_cache[state] = bmp
+        return bmp
+
+    def __RenderButton(self, dc: wx.DC, gc: wx.GCDC):
+        """Draw the button to a DC"""
 
         # Setup
         dc.SetBrush(wx.TRANSPARENT_BRUSH)
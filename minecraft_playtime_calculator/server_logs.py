@@ -0,0 +1,354 @@
+from __future__ import annotations
+
+import argparse
+from collections import defaultdict
+from csv import writer as csv_writer
+import datetime as dt
+import logging
+import math
+from pathlib import Path
+import re
+import time
+from typing import *
+from typing import Match
+
+from .intervals import merge_intervals, split_by_day
+from .minecraft_logs import (
+    get_decoder, iter_logs, log_name_pattern, time_pattern
+)
+from .throttle import ScanThrottle
+
+__all__ = [
+    'PlayerSession', 'ServerLogParser', 'iter_server_logs',
+    'get_player_sessions', 'get_player_playtimes'
+]
+
+logger = logging.getLogger('minecraft_logs_analyzer.server_logs')
+
+T_PlayerPlaytimes = Dict[str, Dict[dt.date, dt.timedelta]]
+
+# One combined pattern for every server event we care about, so each line is
+# matched once. Matches the vanilla "[12:34:56] [Server thread/INFO]: " prefix,
+# the Paper/Spigot "[12:34:56 INFO]: " prefix and prefixes with more bracketed
+# parts, like Forge's
+# "[12:34:56] [Server thread/INFO] [minecraft/DedicatedServer]: ".
+server_event_pattern = re.compile(
+    r'^\[(?P<hour>\d{2}):(?P<min>\d{2}):(?P<sec>\d{2})(?: [A-Z]+)?\]'
+    r'(?: \[[^\]\n]*\])*: '
+    r'(?:'
+    r'(?P<join>[\w.]+) joined the game'
+    r'|(?P<leave>[\w.]+) (?:left the game|lost connection)'
+    r'|(?P<stop>Stopping (?:the )?server)'
+    r'|(?P<start>Starting minecraft server)'
+    r')',
+    re.MULTILINE
+)
+# Text found in every line server_event_pattern matches. Almost every line is
+# irrelevant, so the raw bytes are searched for these with bytes.find (much
+# faster than a regex), and only lines containing one are decoded and matched.
+server_event_keywords = (
+    b'the game', b'lost connection', b'Stopping ', b'Starting minecraft server'
+)
+
+ONE_DAY = dt.timedelta(days=1)
+
+
+class PlayerSession(NamedTuple):
+    player: str
+    start: dt.datetime
+    end: dt.datetime
+
+    @property
+    def duration(self) -> dt.timedelta:
+        return self.end - self.start
+
+
+def _match_time(match: Match) -> dt.timedelta:
+    return dt.timedelta(
+        hours=int(match['hour']),
+        minutes=int(match['min']),
+        seconds=int(match['sec'])
+    )
+
+
+class ServerLogParser:
+    """
+    Builds player sessions from server logs. Logs must be fed in
+    chronological order, because sessions may continue across a log rotation
+    (the server rotates its log at midnight while running).
+    """
+
+    # Small enough for the keyword searches to run from the CPU cache
+    chunk_size = 1 << 18
+
+    def __init__(self):
+        self.sessions: List[PlayerSession] = []
+        self._open_sessions: Dict[str, dt.datetime] = {}
+        self._last_time: Optional[dt.datetime] = None
+        # Lines of the current log containing a keyword, and how many of
+        # them were events
+        self._candidates = 0
+        self._events = 0
+
+    def _join(self, player: str, time: dt.datetime):
+        if player in self._open_sessions:
+            # Missed a leave line; end the old session where the new one
+            # starts
+            self._leave(player, time)
+        self._open_sessions[player] = time
+
+    def _leave(self, player: str, time: dt.datetime):
+        # Disconnects usually log both "lost connection" and "left the game",
+        # so the second one is a no-op
+        start = self._open_sessions.pop(player, None)
+        if start is None:
+            return
+        self.sessions.append(PlayerSession(player, start, max(start, time)))
+
+    def _leave_all(self, time: dt.datetime):
+        for player in list(self._open_sessions):
+            self._leave(player, time)
+
+    def feed(self, file: Path, date: dt.date):
+        """
+        Parse all join/leave events in a log file
+
+        :param file: the log file to read
+        :param date: the date the log starts on
+        """
+        midnight = dt.datetime.combine(date, dt.time())
+        day_offset = dt.timedelta()
+        time_of_day_last: Optional[dt.timedelta] = None
+        tail = b''
+        self._candidates = self._events = 0
+
+        def get_time(time_of_day: dt.timedelta) -> dt.datetime:
+            nonlocal day_offset, time_of_day_last
+            if time_of_day_last is not None and time_of_day < time_of_day_last:
+                # Rolled over midnight
+                day_offset += ONE_DAY
+            time_of_day_last = time_of_day
+            return midnight + day_offset + time_of_day
+
+        log = None
+        try:
+            decoder = get_decoder(file)
+            if decoder is None:
+                logger.warning(
+                    f"Unsupported log file; skipping (file={file.name})"
+                )
+                return
+            log = decoder.open(file)
+            # Only complete lines are scanned; the rest of a chunk is carried
+            # over to the next one. Chunks are searched in place rather than
+            # joined to the carry, to avoid copying them.
+            carry = b''
+            while True:
+                data = log.read(self.chunk_size)
+                if not data:
+                    # The last line doesn't have to end with a newline
+                    if carry:
+                        tail = carry[-256:]
+                        self._feed_chunk(carry, 0, len(carry), get_time)
+                    break
+                line_end = data.rfind(b'\n') + 1
+                if not line_end:
+                    carry += data
+                    continue
+                start = 0
+                if carry:
+                    # Finish the line split between the last chunk and this
+                    start = data.find(b'\n') + 1
+                    tail = carry + data[:start]
+                    self._feed_chunk(tail, 0, len(tail), get_time)
+                if line_end > start:
+                    self._feed_chunk(data, start, line_end, get_time)
+                    tail = data[max(line_end - 256, start):line_end]
+                carry = data[line_end:]
+        except (EOFError, OSError):
+            logger.warning(
+                f"Log file may be corrupted or is unable to be opened; "
+                f"reading stopped early (file={file.name})"
+            )
+        finally:
+            if log is not None:
+                log.close()
+
+        if self._candidates and not self._events:
+            logger.warning(
+                f"Found join/leave messages in an unrecognized format; no "
+                f"playtime was counted (file={file.name})"
+            )
+
+        # Remember when the log ends, in case the server crashed or the next
+        # log belongs to a restarted server
+        end_times = list(time_pattern.finditer(
+            tail.decode('utf-8', errors='ignore')
+        ))
+        if end_times:
+            self._last_time = get_time(_match_time(end_times[-1]))
+
+    def _feed_chunk(
+            self, chunk: bytes, start: int, end: int,
+            get_time: Callable[[dt.timedelta], dt.datetime]
+    ):
+        """Parse the complete lines in ``chunk[start:end]``"""
+        find = chunk.find
+        rfind = chunk.rfind
+        line_starts = set()
+        for keyword in server_event_keywords:
+            index = find(keyword, start, end)
+            while index != -1:
+                line_starts.add(rfind(b'\n', start, index) + 1 or start)
+                index = find(keyword, index + len(keyword), end)
+
+        self._candidates += len(line_starts)
+        # Events have to be handled in the order they happened
+        for line_start in sorted(line_starts):
+            line_end = find(b'\n', line_start, end)
+            if line_end == -1:
+                line_end = end
+            line = chunk[line_start:line_end].decode('utf-8', errors='ignore')
+            match = server_event_pattern.match(line)
+            if match is None:
+                # Probably chat or some other message
+                continue
+
+            time = get_time(_match_time(match))
+            if match['join']:
+                self._join(match['join'], time)
+            elif match['leave']:
+                self._leave(match['leave'], time)
+            elif match['stop']:
+                self._leave_all(time)
+            elif match['start']:
+                # Anyone still online was cut off by a crash
+                if self._last_time is not None:
+                    self._leave_all(self._last_time)
+                self._open_sessions.clear()
+            self._last_time = time
+            self._events += 1
+
+    def close(self) -> List[PlayerSession]:
+        """
+        End all open sessions at the last seen timestamp and return every
+        session parsed so far
+        """
+        if self._last_time is not None:
+            self._leave_all(self._last_time)
+        self._open_sessions.clear()
+        return self.sessions
+
+
+def log_sort_key(log: Tuple[Path, dt.date]) -> Tuple[dt.date, float]:
+    file, date = log
+    name_match = log_name_pattern.fullmatch(file.name)
+    if name_match is None:
+        # latest.log always comes after the archived logs for its date
+        return date, math.inf
+    return date, int(name_match.group('index'))
+
+
+def iter_server_logs(
+        dir_or_file: Union[str, Path]
+) -> Generator[Tuple[Path, dt.date]]:
+    """Iterate over server logs in chronological order"""
+    yield from sorted(iter_logs(dir_or_file), key=log_sort_key)
+
+
+def get_player_sessions(
+        paths: Iterable[Union[str, Path]],
+        throttle: Optional[ScanThrottle] = None
+) -> List[PlayerSession]:
+    """
+    :param paths: server log folders or log files. Each folder of logs is
+        parsed as a separate server; the sessions of a player on several
+        servers are merged by :func:`get_player_playtimes`.
+    :param throttle: limits on how fast logs are read
+    """
+    # Group logs by the folder they're in rather than by argument, so log
+    # files given one by one still continue each other's sessions
+    logs_by_folder: Dict[Path, List[Tuple[Path, dt.date]]] = (
+        defaultdict(list)
+    )
+    for path in paths:
+        for file, date in iter_logs(path):
+            logs_by_folder[file.parent.resolve()].append((file, date))
+
+    sessions = []
+    scan_start = time.monotonic()
+    if throttle is not None:
+        throttle.enter_thread()
+    for logs in logs_by_folder.values():
+        parser = ServerLogParser()
+        cancelled = False
+        for file, date in sorted(logs, key=log_sort_key):
+            if throttle is not None and not throttle.wait_for_file(file):
+                cancelled = True
+                break
+            parser.feed(file, date)
+        sessions.extend(parser.close())
+        if cancelled:
+            break
+    if throttle is not None:
+        throttle.log_summary(time.monotonic() - scan_start)
+    return sessions
+
+
+def get_player_playtimes(
+        sessions: Iterable[PlayerSession]
+) -> T_PlayerPlaytimes:
+    """
+    Sum up playtime per player, per day. Sessions that cross midnight are
+    split between the days they cover, and overlapping sessions of the same
+    player are only counted once.
+    """
+    sessions_by_player: Dict[str, List[Tuple[dt.datetime, dt.datetime]]] = (
+        defaultdict(list)
+    )
+    for player, start, end in sessions:
+        sessions_by_player[player].append((start, end))
+    return {
+        player: split_by_day(merge_intervals(player_sessions))
+        for player, player_sessions in sessions_by_player.items()
+    }
+
+
+def main(args: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        prog="minecraft_playtime_calculator server",
+        description="Calculate per-player playtime from Minecraft server logs"
+    )
+    parser.add_argument(
+        'paths', nargs='+', type=Path,
+        help="server log folders or log files"
+    )
+    parser.add_argument(
+        '--csv', type=Path,
+        help="save per-player, per-day playtime to this CSV file"
+    )
+    ScanThrottle.add_arguments(parser)
+    args = parser.parse_args(args)
+
+    logging.basicConfig(
+        level=logging.INFO, format='[%(levelname)s] %(message)s'
+    )
+    playtimes = get_player_playtimes(get_player_sessions(
+        args.paths, ScanThrottle.from_arguments(args)
+    ))
+
+    for player, days in sorted(playtimes.items()):
+        hours = sum(days.values(), dt.timedelta()).total_seconds() / 3600
+        print(f"{player}: {hours:.2f} hours")
+
+    if args.csv is not None:
+        with open(args.csv, 'w', newline='') as csv_file:
+            writer = csv_writer(csv_file, delimiter=',')
+            writer.writerow(["player", "date", "seconds"])
+            for player, days in sorted(playtimes.items()):
+                for day, playtime in sorted(days.items()):
+                    writer.writerow(
+                        [player, str(day), int(playtime.total_seconds())]
+                    )
+        logger.info(f"Saved CSV file at {args.csv}")
+
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import gzip
+import hashlib
+import json
+import logging
+from pathlib import Path
+import socket
+import time
+from typing import *
+
+from .intervals import PlaytimeIntervals, T_Interval, T_TimePerDay
+from .minecraft_logs import get_log_interval, iter_logs
+from .throttle import ScanThrottle
+
+__all__ = [
+    'PlaytimeSnapshot', 'get_log_fingerprint'
+]
+
+logger = logging.getLogger('minecraft_logs_analyzer.snapshot')
+
+SNAPSHOT_FORMAT = 'minecraft-playtime-snapshot'
+
+# Number of bytes from each end of a log included in its fingerprint
+FINGERPRINT_SAMPLE_SIZE = 4096
+
+# Log start times are saved as seconds since this (they're in local time)
+EPOCH = dt.datetime(1970, 1, 1)
+
+
+def get_log_fingerprint(file: Path) -> str:
+    """
+    Identify a log by its name, size and the bytes at its start and end, so
+    the same log is recognized on different machines without reading all of
+    it
+    """
+    size = file.stat().st_size
+    digest = hashlib.sha1(f'{file.name}\0{size}\0'.encode())
+    with open(file, 'rb') as f:
+        digest.update(f.read(FINGERPRINT_SAMPLE_SIZE))
+        if size > FINGERPRINT_SAMPLE_SIZE:
+            # Don't include bytes from the start twice
+            f.seek(max(
+                size - FINGERPRINT_SAMPLE_SIZE, FINGERPRINT_SAMPLE_SIZE
+            ))
+            digest.update(f.read())
+    return digest.hexdigest()[:24]
+
+
+class PlaytimeSnapshot:
+    """
+    The play session of each scanned log, which can be saved and merged with
+    snapshots from other machines. Logs are identified by fingerprint, so
+    logs scanned on more than one machine are only counted once, and
+    sessions which overlap are merged.
+
+    Snapshots are saved as gzipped JSON, with one array per column.
+    """
+
+    version = 2
+
+    def __init__(self, hosts: Iterable[str] = ()):
+        self.hosts: List[str] = list(hosts)
+        # Play session by log fingerprint
+        self.logs: Dict[str, T_Interval] = {}
+
+    def __len__(self):
+        return len(self.logs)
+
+    def add(self, fingerprint: str, start: dt.datetime, end: dt.datetime):
+        # The first result for a log wins
+        self.logs.setdefault(fingerprint, (start, end))
+
+    @classmethod
+    def from_scan(
+            cls, paths: Iterable[Union[str, Path]],
+            throttle: Optional[ScanThrottle] = None
+    ) -> PlaytimeSnapshot:
+        """
+        Scan logs and record their playtime
+
+        :param paths: log folders or log files
+        :param throttle: limits on how fast logs are read
+        """
+        snapshot = cls([socket.gethostname()])
+        scan_start = time.monotonic()
+        if throttle is not None:
+            throttle.enter_thread()
+        for path in paths:
+            for file, date in iter_logs(path):
+                if throttle is not None and not throttle.wait_for_file(file):
+                    break
+                interval = get_log_interval(file, date)
+                if interval is None:
+                    continue
+                start, end = interval
+                logger.info(f"{file.name} {end - start}")
+                snapshot.add(get_log_fingerprint(file), start, end)
+        if throttle is not None:
+            throttle.log_summary(time.monotonic() - scan_start)
+        return snapshot
+
+    @classmethod
+    def merge(cls, snapshots: Iterable[PlaytimeSnapshot]) -> PlaytimeSnapshot:
+        merged = cls()
+        for snapshot in snapshots:
+            merged.hosts.extend(
+                h for h in snapshot.hosts if h not in merged.hosts
+            )
+            for fingerprint, (start, end) in snapshot.logs.items():
+                merged.add(fingerprint, start, end)
+        return merged
+
+    def get_intervals(self) -> PlaytimeIntervals:
+        return PlaytimeIntervals(self.logs.values())
+
+    def get_playtimes(self) -> Tuple[dt.timedelta, T_TimePerDay]:
+        """
+        :return: a tuple of (total playtime, sorted list of playtime per day)
+        """
+        intervals = self.get_intervals()
+        return intervals.total(), intervals.per_day()
+
+    def save(self, path: Path):
+        fingerprints = list(self.logs)
+        data = {
+            'format': SNAPSHOT_FORMAT,
+            'version': self.version,
+            'created': dt.datetime.now().isoformat(timespec='seconds'),
+            'hosts': self.hosts,
+            'fingerprints': fingerprints,
+            'starts': [
+                int((self.logs[f][0] - EPOCH).total_seconds())
+                for f in fingerprints
+            ],
+            'seconds': [
+                int((self.logs[f][1] - self.logs[f][0]).total_seconds())
+                for f in fingerprints
+            ],
+        }
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path: Path) -> PlaytimeSnapshot:
+        """
+        :raises ValueError: if the file isn't a snapshot, is damaged, or is
+            from a newer version of this program
+        """
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, EOFError, ValueError) as e:
+            raise ValueError(f"Not a playtime snapshot: {path}") from e
+
+        if not isinstance(data, dict) or data.get('format') != SNAPSHOT_FORMAT:
+            raise ValueError(f"Not a playtime snapshot: {path}")
+        if data.get('version') != cls.version:
+            raise ValueError(
+                f"Unsupported snapshot version {data.get('version')}: {path}"
+            )
+
+        try:
+            snapshot = cls(str(host) for host in data['hosts'])
+            fingerprints = data['fingerprints']
+            starts = data['starts']
+            seconds = data['seconds']
+            if not len(fingerprints) == len(starts) == len(seconds):
+                raise ValueError("columns have different lengths")
+            for fingerprint, start, duration in zip(
+                    fingerprints, starts, seconds
+            ):
+                start = EPOCH + dt.timedelta(seconds=int(start))
+                snapshot.add(
+                    str(fingerprint), start,
+                    start + dt.timedelta(seconds=int(duration))
+                )
+        except (KeyError, ValueError, TypeError, OverflowError) as e:
+            raise ValueError(f"Damaged playtime snapshot: {path}") from e
+        return snapshot
+
+
+def main(args: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        prog="minecraft_playtime_calculator snapshot",
+        description="Create and merge playtime snapshots"
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    create = commands.add_parser(
+        'create', help="scan logs and save a snapshot of the results"
+    )
+    create.add_argument(
+        'paths', nargs='+', type=Path, help="log folders or log files"
+    )
+    create.add_argument('-o', '--output', type=Path, required=True)
+    ScanThrottle.add_arguments(create)
+
+    merge = commands.add_parser(
+        'merge', help="combine snapshots, counting each log once"
+    )
+    merge.add_argument('snapshots', nargs='+', type=Path)
+    merge.add_argument('-o', '--output', type=Path, required=True)
+
+    args = parser.parse_args(args)
+    logging.basicConfig(
+        level=logging.INFO, format='[%(levelname)s] %(message)s'
+    )
+
+    if args.command == 'create':
+        snapshot = PlaytimeSnapshot.from_scan(
+            args.paths, ScanThrottle.from_arguments(args)
+        )
+    else:
+        try:
+            snapshot = PlaytimeSnapshot.merge(
+                PlaytimeSnapshot.load(path) for path in args.snapshots
+            )
+        except ValueError as e:
+            logger.error(str(e))
+            return 1
+
+    snapshot.save(args.output)
+    total_time, _ = snapshot.get_playtimes()
+    hours = total_time.total_seconds() / 3600
+    logger.info(
+        f"Saved snapshot of {len(snapshot)} logs at {args.output} "
+        f"({hours:.2f} hours)"
+    )
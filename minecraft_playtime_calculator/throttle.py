@@ -0,0 +1,331 @@
+from __future__ import annotations
+
+import argparse
+import ctypes
+import ctypes.util
+import logging
+import os
+from pathlib import Path
+import platform
+import signal
+import sys
+import threading
+import time
+from typing import *
+
+__all__ = [
+    'TokenBucket', 'ScanThrottle', 'lower_thread_priority'
+]
+
+logger = logging.getLogger('minecraft_logs_analyzer.throttle')
+
+# Niceness of throttled scan threads (19 is the lowest priority)
+BACKGROUND_NICENESS = 10
+
+# Linux ioprio_set syscall numbers
+_SYS_IOPRIO_SET = {
+    'x86_64': 251, 'amd64': 251, 'i386': 289, 'i686': 289,
+    'aarch64': 30, 'arm64': 30, 'armv7l': 314,
+}
+_IOPRIO_WHO_PROCESS = 1
+_IOPRIO_CLASS_IDLE = 3
+_IOPRIO_CLASS_SHIFT = 13
+
+# Windows SetThreadPriority
+_THREAD_MODE_BACKGROUND_BEGIN = 0x00010000
+
+# macOS pthread_set_qos_class_self_np
+_QOS_CLASS_BACKGROUND = 0x09
+
+
+def _lower_priority_linux() -> bool:
+    lowered = False
+    # Linux threads have their own niceness and I/O priority, and 0 refers to
+    # the calling thread, so the rest of the process is unaffected
+    try:
+        os.setpriority(
+            os.PRIO_PROCESS, 0,
+            max(os.getpriority(os.PRIO_PROCESS, 0), BACKGROUND_NICENESS)
+        )
+        lowered = True
+    except OSError:
+        pass
+
+    syscall_number = _SYS_IOPRIO_SET.get(platform.machine().lower())
+    if syscall_number is not None:
+        # Only has an effect with the BFQ and CFQ I/O schedulers
+        libc = ctypes.CDLL(None, use_errno=True)
+        result = libc.syscall(
+            syscall_number, _IOPRIO_WHO_PROCESS, 0,
+            _IOPRIO_CLASS_IDLE << _IOPRIO_CLASS_SHIFT
+        )
+        lowered = result == 0 or lowered
+    return lowered
+
+
+def _lower_priority_windows() -> bool:
+    # Background mode lowers both the CPU and I/O priority of the thread
+    kernel32 = ctypes.windll.kernel32
+    return bool(kernel32.SetThreadPriority(
+        kernel32.GetCurrentThread(), _THREAD_MODE_BACKGROUND_BEGIN
+    ))
+
+
+def _lower_priority_mac() -> bool:
+    # The background QoS class lowers both CPU and I/O priority
+    libc = ctypes.CDLL(ctypes.util.find_library('c'))
+    return libc.pthread_set_qos_class_self_np(_QOS_CLASS_BACKGROUND, 0) == 0
+
+
+def lower_thread_priority() -> bool:
+    """
+    Lower the CPU and I/O priority of the calling thread, where the OS allows
+    it
+
+    :return: whether the priority was lowered
+    """
+    try:
+        if sys.platform.startswith('linux'):
+            return _lower_priority_linux()
+        if sys.platform == 'win32':
+            return _lower_priority_windows()
+        if sys.platform == 'darwin':
+            return _lower_priority_mac()
+    except (OSError, AttributeError):
+        logger.debug("Unable to lower thread priority", exc_info=True)
+    return False
+
+
+class TokenBucket:
+    """
+    Rate limiter allowing `rate` units per second on average, with bursts of
+    up to `capacity` units
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = rate if capacity is None else capacity
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+
+    def reserve(self, amount: float) -> float:
+        """
+        Take tokens, going into debt if there aren't enough. Amounts larger
+        than the capacity are allowed, and just take longer to pay back.
+
+        :return: seconds until the tokens are paid for
+        """
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity,
+            self._tokens + (now - self._last_refill) * self.rate
+        )
+        self._last_refill = now
+        self._tokens -= amount
+        if self._tokens >= 0:
+            return 0.0
+        return -self._tokens / self.rate
+
+
+class ScanThrottle:
+    """
+    Limits how fast a scan reads logs, so it can run alongside
+    latency-sensitive programs (like a game server). The scan can also be
+    paused and resumed from another thread.
+
+    Each scanning thread calls :meth:`enter_thread` once, then
+    :meth:`wait_for_file` before reading each log. Bytes are
+    counted by the size of the log on disk, which is more than what is
+    actually read from uncompressed logs.
+    """
+
+    def __init__(
+            self, mb_per_second: Optional[float] = None,
+            files_per_second: Optional[float] = None,
+            low_priority: bool = True
+    ):
+        """
+        :param mb_per_second: maximum megabytes of logs read per second
+        :param files_per_second: maximum number of logs read per second
+        :param low_priority: lower the CPU and I/O priority of the scanning
+            threads
+        """
+        self.low_priority = low_priority
+        self._bytes = None
+        if mb_per_second:
+            self._bytes = TokenBucket(mb_per_second * 1_000_000)
+        self._files = None
+        if files_per_second:
+            self._files = TokenBucket(files_per_second)
+
+        self._condition = threading.Condition()
+        self._paused = False
+        self._cancelled = False
+        # Seconds spent waiting, summed over all scanning threads
+        self.throttled_time = 0.0
+        self.paused_time = 0.0
+
+    def limited(self) -> bool:
+        """Check if there are any limits on how fast logs are read"""
+        return self._bytes is not None or self._files is not None
+
+    def pause(self):
+        with self._condition:
+            self._paused = True
+            self._condition.notify_all()
+
+    def resume(self):
+        with self._condition:
+            self._paused = False
+            self._condition.notify_all()
+
+    def paused(self) -> bool:
+        return self._paused
+
+    def cancel(self):
+        """Wake up any waiting threads, and stop all further waiting"""
+        with self._condition:
+            self._cancelled = True
+            self._condition.notify_all()
+
+    def toggle_pause(self):
+        with self._condition:
+            if self._paused:
+                self.resume()
+            else:
+                self.pause()
+
+    def pause_on_signal(self) -> bool:
+        """
+        Toggle pausing when the process receives SIGUSR1 (not available on
+        Windows). Must be called from the main thread.
+
+        :return: whether the signal handler was installed
+        """
+        if not hasattr(signal, 'SIGUSR1'):
+            return False
+
+        def handler(signum, frame):
+            self.toggle_pause()
+            logger.info("Scan paused" if self._paused else "Scan resumed")
+
+        signal.signal(signal.SIGUSR1, handler)
+        return True
+
+    def enter_thread(self):
+        """Set up the calling thread for throttled scanning"""
+        if self.low_priority and not lower_thread_priority():
+            logger.info("Unable to lower the priority of the scan")
+
+    def _reserve(self, size: int) -> float:
+        delay = 0.0
+        if self._files is not None:
+            delay = max(delay, self._files.reserve(1))
+        if self._bytes is not None:
+            delay = max(delay, self._bytes.reserve(size))
+        return delay
+
+    def wait(self, size: int) -> bool:
+        """
+        Block until a log of this many bytes may be read, or while paused
+
+        :return: False if the throttle was cancelled
+        """
+        deadline = None
+        with self._condition:
+            while not self._cancelled:
+                if self._paused:
+                    start = time.monotonic()
+                    self._condition.wait_for(
+                        lambda: not self._paused or self._cancelled
+                    )
+                    self.paused_time += time.monotonic() - start
+                    continue
+                if deadline is None:
+                    deadline = time.monotonic() + self._reserve(size)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return True
+                start = time.monotonic()
+                # Wake up early to pause or cancel
+                self._condition.wait_for(
+                    lambda: self._paused or self._cancelled, remaining
+                )
+                self.throttled_time += time.monotonic() - start
+        return False
+
+    def wait_for_file(self, file: Path) -> bool:
+        """
+        Block until a log may be read, or while paused. A log which can't be
+        stat'd (like one deleted since it was found) only counts towards the
+        files/s limit; the reader is left to skip it.
+
+        :return: False if the throttle was cancelled
+        """
+        try:
+            size = file.stat().st_size
+        except OSError:
+            size = 0
+        return self.wait(size)
+
+    def summary(self, elapsed: float, threads: int = 1) -> str:
+        """
+        Describe the time spent throttled in a scan
+
+        :param elapsed: seconds the scan took
+        :param threads: number of threads the scan waited on the throttle
+            from. Waiting time is averaged over them.
+        """
+        throttled = self.throttled_time / threads
+        paused = self.paused_time / threads
+        active = max(elapsed - paused, 1e-9)
+        text = (
+            f"Throttling added {throttled:.1f} s "
+            f"({throttled / active:.0%} of {active:.1f} s scanning)"
+        )
+        if paused:
+            text += f", paused for {paused:.1f} s"
+        return text
+
+    def log_summary(self, elapsed: float, threads: int = 1):
+        """Log the :meth:`summary` if the scan was limited or paused"""
+        if self.limited() or self.paused_time:
+            logger.info(self.summary(elapsed, threads))
+
+    @staticmethod
+    def add_arguments(parser: argparse.ArgumentParser):
+        group = parser.add_argument_group(
+            "throttling", "limit the impact of the scan on other programs"
+        )
+        group.add_argument(
+            '--max-mbps', type=float, metavar='MB',
+            help="read at most this many megabytes of logs per second"
+        )
+        group.add_argument(
+            '--max-files-per-second', type=float, metavar='N',
+            help="read at most this many logs per second"
+        )
+        group.add_argument(
+            '--low-priority', action='store_true',
+            help="lower the CPU and I/O priority of the scan"
+        )
+
+    @classmethod
+    def from_arguments(
+            cls, args: argparse.Namespace
+    ) -> Optional[ScanThrottle]:
+        """Create a throttle from :meth:`add_arguments`, if any were given"""
+        if not (args.max_mbps or args.max_files_per_second
+                or args.low_priority):
+            return None
+        throttle = cls(
+            args.max_mbps, args.max_files_per_second, args.low_priority
+        )
+        if throttle.pause_on_signal():
+            logger.info(
+                f"Send SIGUSR1 (kill -USR1 {os.getpid()}) to pause or "
+                f"resume the scan"
+            )
+        return throttle
@@ -1,13 +1,13 @@
 from __future__ import annotations
 
-from collections import defaultdict
 from csv import writer as csv_writer
 import datetime as dt
 from enum import Enum
-from glob import iglob
 import logging
+import os
 from pathlib import Path
 import threading
+import time
 from typing import *
 
 try:
@@ -18,8 +18,13 @@ import wx
 import wx.lib.newevent
 from wx.lib.platebtn import PB_STYLE_SQUARE
 
+from .intervals import PlaytimeIntervals, T_Interval, T_TimePerDay
+from .journal import JournalEntry, ScanJournal
+from .last_scan import LastScan, expand_globs, get_log_set_fingerprint
 from .minecraft_logs import *
 from .plate_button import PlateButton
+from .snapshot import PlaytimeSnapshot
+from .throttle import ScanThrottle
 from .wx_utils import *
 
 parent_logger = logging.getLogger('minecraft_logs_analyzer')
@@ -41,31 +46,160 @@ class ScanningState(Enum):
     CANCELLING = 2
 
 
-T_TimePerDay = List[Tuple[dt.date, dt.timedelta]]
 ScanCompleteEvent, EVT_WX_SCAN_COMPLETE = wx.lib.newevent.NewEvent()
+ScanProgressEvent, EVT_WX_SCAN_PROGRESS = wx.lib.newevent.NewEvent()
 
 
 # noinspection PyBroadException
 class PlaytimeCounterThread(threading.Thread):
 
-    def __init__(self, parent: wx.Window, paths: List[Path], *args, **kwargs):
+    # Minimum number of seconds between partial result snapshots
+    progress_interval = 0.5
+
+    def __init__(
+            self, parent: wx.Window, paths: List[Path],
+            journal: Optional[ScanJournal] = None,
+            journaled: Optional[Dict[str, JournalEntry]] = None,
+            throttle: Optional[ScanThrottle] = None,
+            save_last_scan: bool = False,
+            globs: Optional[List[str]] = None, *args, **kwargs
+    ):
+        """
+        :param parent: window to post scan events to
+        :param paths: folders or log files to scan
+        :param journal: journal to record finished logs in
+        :param journaled: logs the journal already has results for, from
+            :meth:`ScanJournal.load_unfinished`. Given to resume a scan.
+        :param throttle: limits on how fast logs are read. Needed to pause
+            the scan.
+        :param save_last_scan: save the results of the scan if it completes,
+            to be shown next time the program starts
+        :param globs: the globs the paths were found with, if any. Saved
+            with the last scan instead of the paths, so logs matching them
+            later are noticed.
+        """
         super().__init__(*args, **kwargs)
         self._stop_event = threading.Event()
         self._parent = parent
         self._paths = paths
+        self._journal = journal
+        self._journaled = journaled
+        self._throttle = throttle
+        self._save_last_scan = save_last_scan
+        self._globs = globs
 
     def stop(self):
         self._stop_event.set()
+        if self._throttle is not None:
+            # Don't stay stuck waiting on the throttle
+            self._throttle.cancel()
 
     def stopped(self):
         return self._stop_event.is_set()
 
+    def pause(self):
+        if self._throttle is not None:
+            self._throttle.pause()
+
+    def resume(self):
+        if self._throttle is not None:
+            self._throttle.resume()
+
+    def paused(self) -> bool:
+        return self._throttle is not None and self._throttle.paused()
+
+    def post_progress(self, intervals_delta: List[T_Interval]):
+        """
+        Publish the play sessions found since the last snapshot. The list is
+        handed off to the receiver, so the caller must not modify it
+        afterwards.
+        """
+        event = ScanProgressEvent(intervals_delta=intervals_delta)
+        wx.PostEvent(self._parent, event)
+
+    def open_journal(self) -> Dict[str, JournalEntry]:
+        """
+        Open the journal, and get the logs it already has results for if
+        resuming
+        """
+        journal = self._journal
+        if journal is None:
+            return {}
+        resume = self._journaled is not None
+        try:
+            journal.open(resume=resume)
+        except OSError:
+            logger.warning(
+                "Unable to open the scan journal; progress won't be saved",
+                exc_info=True
+            )
+            self._journal = None
+            return {}
+        return self._journaled if resume else {}
+
+    def journal_log(
+            self, file: Path, stat: os.stat_result,
+            interval: Optional[T_Interval]
+    ):
+        if self._journal is None:
+            return
+        try:
+            self._journal.append(file, stat, interval)
+        except OSError:
+            logger.warning(
+                "Unable to write to the scan journal; progress won't be saved",
+                exc_info=True
+            )
+            self._journal.close()
+            self._journal = None
+
+    def close_journal(self, complete: bool):
+        if self._journal is None:
+            return
+        try:
+            if complete:
+                self._journal.compact()
+            else:
+                self._journal.close()
+        except OSError:
+            logger.warning("Unable to save the scan journal", exc_info=True)
+
+    def save_last_scan(
+            self, log_stats: List[Tuple[str, int, int]],
+            total_time: dt.timedelta, time_per_day: T_TimePerDay
+    ):
+        if self._globs is not None:
+            inputs = list(self._globs)
+        else:
+            inputs = [str(p) for p in self._paths]
+        last_scan = LastScan(
+            inputs, get_log_set_fingerprint(log_stats), len(log_stats),
+            dt.datetime.now(), total_time, time_per_day,
+            globs=self._globs is not None
+        )
+        try:
+            last_scan.save()
+        except OSError:
+            logger.warning("Unable to save the scan results", exc_info=True)
+
     def run(self) -> NoReturn:
-        total_time = dt.timedelta()
-        # Logs for a given date may be split to reduce filesize, so multiple
-        # timedeltas for a date will be summed
-        playtimes: Dict[dt.date, dt.timedelta] = defaultdict(dt.timedelta)
+        # Concurrent game instances and logs split to reduce filesize can
+        # overlap, so sessions are merged before being summed
+        intervals = PlaytimeIntervals()
+        # Sessions found since the last progress snapshot
+        intervals_delta: List[T_Interval] = []
+        # Path, size and modification time of every log, to tell if they
+        # change later
+        log_stats: List[Tuple[str, int, int]] = []
+        scan_start = last_progress = time.monotonic()
         cancelled = False
+        throttle = self._throttle
+        if throttle is not None:
+            throttle.enter_thread()
+
+        journaled = self.open_journal()
+        if journaled:
+            logger.info(f"Resuming scan; {len(journaled)} logs already done")
 
         try:
             for path in self._paths:
@@ -73,24 +207,66 @@ class PlaytimeCounterThread(threading.Thread):
                     if self.stopped():
                         cancelled = True
                         break
-                    delta = get_log_timedelta(file)
-                    if delta is None:
+
+                    try:
+                        stat = file.stat()
+                    except OSError:
+                        # Deleted since it was found, like latest.log being
+                        # rotated when the game starts
+                        logger.warning(
+                            f"Log file disappeared; skipping "
+                            f"(file={file.name})"
+                        )
+                        continue
+                    log_stats.append(
+                        (str(file), stat.st_size, stat.st_mtime_ns)
+                    )
+                    entry = journaled.get(str(file))
+                    if entry is not None and entry.matches(stat):
+                        interval = entry.interval
+                    else:
+                        if (throttle is not None
+                                and not throttle.wait(stat.st_size)):
+                            cancelled = True
+                            break
+                        interval = get_log_interval(file, date)
+                        self.journal_log(file, stat, interval)
+                    if interval is None:
                         continue
-                    logger.info(f"{file.name} {delta}")
-                    playtimes[date] += delta
-                    total_time += delta
+                    start, end = interval
+                    logger.info(f"{file.name} {end - start}")
+                    intervals.add(start, end)
+                    intervals_delta.append(interval)
+
+                    now = time.monotonic()
+                    if now - last_progress >= self.progress_interval:
+                        self.post_progress(intervals_delta)
+                        intervals_delta = []
+                        last_progress = now
         except:
             logger.error(
                 "Unexpected error while scanning! Aborting.", exc_info=True
             )
+            # Flush whatever hasn't been published yet so the partial results
+            # are kept
+            if intervals_delta:
+                self.post_progress(intervals_delta)
+            self.close_journal(complete=False)
             event = ScanCompleteEvent(success=False)
             wx.PostEvent(self._parent, event)
             return
 
-        playtimes_sorted = list(sorted(playtimes.items()))
+        self.close_journal(complete=not cancelled)
+        # Do the merge here rather than in the UI thread
+        total_time = intervals.total()
+        time_per_day = intervals.per_day()
+        if self._save_last_scan and not cancelled:
+            self.save_last_scan(log_stats, total_time, time_per_day)
+        if throttle is not None:
+            throttle.log_summary(time.monotonic() - scan_start)
         event = ScanCompleteEvent(
-            success=True, cancelled=cancelled,
-            total_time=total_time, time_per_day=playtimes_sorted
+            success=True, cancelled=cancelled, intervals=intervals,
+            total_time=total_time, time_per_day=time_per_day
         )
         wx.PostEvent(self._parent, event)
 
@@ -107,6 +283,10 @@ class MinecraftPlaytimeCalculatorFrame(wx.Frame):
 
     text_begin_scan = "Calculate playtime"
 
+    # Limits for low impact scans
+    low_impact_mb_per_second = 5
+    low_impact_files_per_second = 20
+
     font_size = 11
     background_color = '#23272A'
     outline_color = '#2C2F33'
@@ -121,6 +301,10 @@ class MinecraftPlaytimeCalculatorFrame(wx.Frame):
         self._scan_thread: Optional[PlaytimeCounterThread] = None
         self.playtime_total: Optional[dt.timedelta] = None
         self.playtime_days: Optional[T_TimePerDay] = None
+        # Play sessions found so far, built up from partial scan results
+        self.playtime_intervals = PlaytimeIntervals()
+        # Whether playtime_total and playtime_days are behind the intervals
+        self._playtimes_stale = False
         self.scan_mode = ScanMode.AUTOMATIC
         self.scanning_state = ScanningState.IDLE
         self.graph_months = None
@@ -131,12 +315,16 @@ class MinecraftPlaytimeCalculatorFrame(wx.Frame):
 
         self.Bind(wx.EVT_CLOSE, self.OnClose)
         self.Bind(EVT_WX_SCAN_COMPLETE, self.OnScanComplete)
+        self.Bind(EVT_WX_SCAN_PROGRESS, self.OnScanProgress)
         self.panel_controls.Bind(wx.EVT_RADIOBUTTON, self.OnChangeScanMode)
         self.scan_button.Bind(wx.EVT_BUTTON, self.OnScanButton)
+        self.pause_button.Bind(wx.EVT_BUTTON, self.OnPauseButton)
         self.graph_button.Bind(wx.EVT_BUTTON, self.OnGraphButton)
         self.csv_button.Bind(wx.EVT_BUTTON, self.OnCSVButton)
+        self.snapshot_button.Bind(wx.EVT_BUTTON, self.OnSnapshotButton)
 
         self.Show(True)
+        self.load_last_scan()
 
     def _init_logging(self):
         self._log_handler = WxLogHandler(self, logging.INFO)
@@ -218,6 +406,14 @@ class MinecraftPlaytimeCalculatorFrame(wx.Frame):
 
         sizer_controls.Add(panel_path)
 
+        # Throttling
+        self.low_impact_checkbox = low_impact = wx.CheckBox(
+            panel_controls, label="Low impact scan (slower)"
+        )
+        low_impact.SetForegroundColour(fg)
+        sizer_controls.AddSpacer(self.margin_control)
+        sizer_controls.Add(low_impact)
+
         # Buttons
 
         sizer_controls.AddStretchSpacer(1)
@@ -228,6 +424,13 @@ class MinecraftPlaytimeCalculatorFrame(wx.Frame):
         )
         scan_button.SetBackgroundColour(element_color)
 
+        self.pause_button = pause_button = PlateButton(
+            panel_controls, label="Pause",
+            style=PB_STYLE_SQUARE, size=(-1, 60)
+        )
+        pause_button.SetBackgroundColour(element_color)
+        pause_button.Disable()
+
         self.graph_button = graph_button = PlateButton(
             panel_controls, label="Show graph",
             style=PB_STYLE_SQUARE, size=(-1, 60)
@@ -242,11 +445,21 @@ class MinecraftPlaytimeCalculatorFrame(wx.Frame):
         csv_button.SetBackgroundColour(element_color)
         csv_button.Disable()
 
+        self.snapshot_button = snapshot_button = PlateButton(
+            panel_controls, label="Open snapshot",
+            style=PB_STYLE_SQUARE, size=(-1, 60)
+        )
+        snapshot_button.SetBackgroundColour(element_color)
+
         sizer_controls.Add(scan_button, 0, wx.EXPAND)
         sizer_controls.AddSpacer(self.margin_main // 2)
+        sizer_controls.Add(pause_button, 0, wx.EXPAND)
+        sizer_controls.AddSpacer(self.margin_main // 2)
         sizer_controls.Add(graph_button, 0, wx.EXPAND)
         sizer_controls.AddSpacer(self.margin_main // 2)
         sizer_controls.Add(csv_button, 0, wx.EXPAND)
+        sizer_controls.AddSpacer(self.margin_main // 2)
+        sizer_controls.Add(snapshot_button, 0, wx.EXPAND)
 
         # Add log output
 
@@ -289,10 +502,42 @@ class MinecraftPlaytimeCalculatorFrame(wx.Frame):
         elif self.scanning_state is ScanningState.RUNNING:
             self.stop_scan()
 
+    def OnPauseButton(self, e: wx.CommandEvent):
+        if self._scan_thread is None:
+            return
+        if self._scan_thread.paused():
+            logger.info("Resuming log scan")
+            self._scan_thread.resume()
+            self.pause_button.SetLabel("Pause")
+        else:
+            logger.info("Pausing log scan")
+            self._scan_thread.pause()
+            self.pause_button.SetLabel("Resume")
+
+    def OnScanProgress(self, e: ScanProgressEvent):
+        if self._scan_thread is None:
+            # Stale snapshot from a scan that has already finished
+            return
+        # Merging happens when the totals are actually needed
+        self.playtime_intervals.extend(e.intervals_delta)
+        self._playtimes_stale = True
+        self.graph_months = None
+        self.graph_times = None
+
+        self.graph_button.Enable()
+        self.csv_button.Enable()
+
     def OnScanComplete(self, e: ScanCompleteEvent):
         self._scan_thread = None
         self.update_scanning_state(ScanningState.IDLE)
         if not e.success:
+            self.update_playtimes()
+            if self.playtime_total is not None:
+                hours = self.playtime_total.total_seconds() / 3600
+                days = hours / 24
+                logger.info(
+                    f"Partial total time: {hours:.2f} hours ({days:.2f} days)"
+                )
             return
 
         self.scan_button.Enable()
@@ -300,8 +545,12 @@ class MinecraftPlaytimeCalculatorFrame(wx.Frame):
         self.csv_button.Enable()
 
         cancelled = e.cancelled
+        self.playtime_intervals = e.intervals
         self.playtime_total = e.total_time
         self.playtime_days = e.time_per_day
+        self._playtimes_stale = False
+        self.graph_months = None
+        self.graph_times = None
         hours = self.playtime_total.total_seconds() / 3600
         days = hours / 24
 
@@ -317,17 +566,28 @@ class MinecraftPlaytimeCalculatorFrame(wx.Frame):
     def OnCSVButton(self, e: wx.CommandEvent):
         self.create_csv()
 
+    def OnSnapshotButton(self, e: wx.CommandEvent):
+        self.open_snapshot()
+
     def update_scanning_state(self, new_state: ScanningState):
         self.scanning_state = new_state
         button = self.scan_button
         if new_state is ScanningState.IDLE:
             button.SetLabel(self.text_begin_scan)
             button.Enable()
+            self.pause_button.SetLabel("Pause")
+            self.pause_button.Disable()
+            self.snapshot_button.Enable()
+            self.low_impact_checkbox.Enable()
         if new_state is ScanningState.RUNNING:
             button.SetLabel("Cancel")
+            self.pause_button.Enable()
+            self.snapshot_button.Disable()
+            self.low_impact_checkbox.Disable()
         if new_state is ScanningState.CANCELLING:
             button.SetLabel("Cancelling...")
             button.Disable()
+            self.pause_button.Disable()
 
     def start_scan(self):
         if self._scan_thread is None:
@@ -342,14 +602,48 @@ class MinecraftPlaytimeCalculatorFrame(wx.Frame):
             if paths is None:
                 logger.error("No files to scan. Scan aborted")
                 return
+
+            journal = ScanJournal.for_inputs(paths)
+            journaled = None
+            try:
+                # The journal is only read once; the entries are handed to
+                # the scan thread
+                journaled = journal.load_unfinished()
+            except OSError:
+                logger.warning("Unable to read the scan journal", exc_info=True)
+            if journaled is not None and wx.MessageBox(
+                    "A previous scan of these logs didn't finish. Resume it?",
+                    "Resume scan", wx.YES_NO | wx.ICON_QUESTION, self
+            ) != wx.YES:
+                journaled = None
             logger.info("Starting log scan")
 
             self.playtime_total = None
             self.playtime_days = None
+            self.playtime_intervals = PlaytimeIntervals()
+            self._playtimes_stale = False
             self.graph_months = None
             self.graph_times = None
 
-            self._scan_thread = PlaytimeCounterThread(self, paths)
+            if self.low_impact_checkbox.GetValue():
+                throttle = ScanThrottle(
+                    self.low_impact_mb_per_second,
+                    self.low_impact_files_per_second
+                )
+            else:
+                # No limits, but still allows pausing
+                throttle = ScanThrottle(low_priority=False)
+
+            globs = None
+            if self.scan_mode == ScanMode.GLOB:
+                globs = [
+                    glob.strip(' ')
+                    for glob in self.path_input.GetValue().split('|')
+                ]
+            self._scan_thread = PlaytimeCounterThread(
+                self, paths, journal, journaled, throttle,
+                save_last_scan=True, globs=globs
+            )
             self._scan_thread.start()
             self.update_scanning_state(ScanningState.RUNNING)
 
@@ -388,16 +682,108 @@ class MinecraftPlaytimeCalculatorFrame(wx.Frame):
             return paths
 
         if scan_mode == ScanMode.GLOB:
-            paths = []
-            for glob in paths_or_globs:
-                for path in iglob(glob.strip(' '), recursive=True):
-                    path = Path(path)
-                    paths.append(path)
+            paths = expand_globs(paths_or_globs)
             if not paths:
                 logger.error(f"The specified file(s) could not be found")
                 return
             return paths
 
+    def open_snapshot(self):
+        if self._scan_thread is not None:
+            logger.error("Wait for the scan to finish first")
+            return
+
+        with wx.FileDialog(
+                self, "Open snapshot",
+                wildcard='Playtime snapshots (*.json.gz)|*.json.gz|'
+                         'All files|*.*',
+                style=wx.FD_OPEN | wx.FD_FILE_MUST_EXIST
+        ) as file_dialog:
+            if file_dialog.ShowModal() == wx.ID_CANCEL:
+                return
+            path = Path(file_dialog.GetPath())
+
+        try:
+            snapshot = PlaytimeSnapshot.load(path)
+        except ValueError as e:
+            logger.error(str(e))
+            return
+
+        self.playtime_intervals = snapshot.get_intervals()
+        self._playtimes_stale = True
+        self.update_playtimes()
+        self.graph_months = None
+        self.graph_times = None
+        self.graph_button.Enable()
+        self.csv_button.Enable()
+
+        hours = self.playtime_total.total_seconds() / 3600
+        days = hours / 24
+        hosts = ', '.join(snapshot.hosts) or "unknown"
+        logger.info(
+            f"Opened snapshot of {len(snapshot)} logs from {hosts}"
+        )
+        logger.info(f"Total time: {hours:.2f} hours ({days:.2f} days)")
+
+    def update_playtimes(self):
+        """Recalculate the totals if play sessions were added since"""
+        if not self._playtimes_stale:
+            return
+        self.playtime_total = self.playtime_intervals.total()
+        self.playtime_days = self.playtime_intervals.per_day()
+        self._playtimes_stale = False
+
+    def load_last_scan(self):
+        """
+        Show the results of the last completed scan, then check in the
+        background whether the logs have changed since
+        """
+        last_scan = LastScan.load()
+        if last_scan is None:
+            return
+
+        self.playtime_total = last_scan.total_time
+        self.playtime_days = last_scan.time_per_day
+        self.graph_button.Enable()
+        self.csv_button.Enable()
+
+        hours = self.playtime_total.total_seconds() / 3600
+        days = hours / 24
+        logger.info(
+            f"Loaded the results of the last scan "
+            f"({last_scan.finished:%Y-%m-%d %H:%M})"
+        )
+        logger.info(f"Total time: {hours:.2f} hours ({days:.2f} days)")
+
+        threading.Thread(
+            target=self._check_last_scan, args=(last_scan,), daemon=True
+        ).start()
+
+    def _check_last_scan(self, last_scan: LastScan):
+        # Runs in a background thread; this only stats the logs
+        try:
+            changed, log_count = last_scan.logs_changed()
+        except OSError:
+            changed, log_count = True, None
+        wx.CallAfter(self._on_last_scan_checked, changed, log_count)
+
+    def _on_last_scan_checked(self, changed: bool, log_count: Optional[int]):
+        # The window may have been closed, or a scan started, in the meantime
+        if not self or self._scan_thread is not None:
+            return
+        if not changed:
+            logger.info("No logs have changed since the last scan")
+        elif log_count is None:
+            logger.info(
+                "Some of the last scanned folders are missing. Run a scan to "
+                "update the results."
+            )
+        else:
+            logger.info(
+                f"Logs have changed since the last scan ({log_count} logs "
+                f"now). Run a scan to update the results."
+            )
+
     def prepare_graph_data(self) -> NoReturn:
 
         if self.graph_months is not None and self.graph_times is not None:
@@ -426,7 +812,7 @@ class MinecraftPlaytimeCalculatorFrame(wx.Frame):
         months: List[str] = []
         times: List[dt.timedelta] = []
         last_month: int = 0
-        for day, time in self.playtime_days:
+        for day, playtime in self.playtime_days:
             # We can safely assume dates are sorted
             month = month_to_int(day)
             if month > last_month:
@@ -439,7 +825,7 @@ class MinecraftPlaytimeCalculatorFrame(wx.Frame):
                 add_month(month)
                 times.append(dt.timedelta())
             # Sum up time for this month
-            times[-1] += time
+            times[-1] += playtime
             last_month = month
         self.graph_months = months
         self.graph_times = [t.total_seconds() / 3600 for t in times]
@@ -450,6 +836,7 @@ class MinecraftPlaytimeCalculatorFrame(wx.Frame):
                 "matplotlib is not installed, so graphing is unavailable"
             )
             return
+        self.update_playtimes()
         if not self.playtime_days:
             logger.warning(
                 "Not enough data to create a graph; one full month is "
@@ -484,6 +871,7 @@ class MinecraftPlaytimeCalculatorFrame(wx.Frame):
             )
 
     def create_csv(self):
+        self.update_playtimes()
         if self.playtime_days is None:
             logger.error(
                 "No time data has been collected yet. Run a scan first."
@@ -503,8 +891,8 @@ class MinecraftPlaytimeCalculatorFrame(wx.Frame):
             with open(path, 'w', newline='') as csv_file:
                 writer = csv_writer(csv_file, delimiter=',')
                 writer.writerow(["date", "seconds"])
-                for day, time in self.playtime_days:
-                    writer.writerow([str(day), int(time.total_seconds())])
+                for day, playtime in self.playtime_days:
+                    writer.writerow([str(day), int(playtime.total_seconds())])
         except PermissionError:
             logger.error(
                 f"Failed to save file at {path}. This is probably because you "